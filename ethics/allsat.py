@@ -0,0 +1,264 @@
+"""
+All models of a propositional formula in pure Python.
+
+A drop-in replacement for the C extension ethics.extensions.sat, used
+when it is not built. The formula is compiled into a reduced ordered
+binary decision diagram over the integer variables 1, ..., n (the i-th
+atom is variable i + 1), and the models are the paths to the 1-leaf.
+Each path is a cube, i.e., a partial assignment all of whose extensions
+are models, and the cubes of different paths are disjoint, so they
+compress the models the same way as the cubes of the extension.
+"""
+from ethics.language import Bool, Not, And, Or, Impl, BiImpl, _postorder, _operands, _constant
+from functools import reduce
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD():
+    """ A reduced ordered binary decision diagram manager.
+
+    Nodes are integers indexing the lists var, lo and hi, with the leaves
+    FALSE and TRUE. Variables are positive integers, smaller variables
+    are closer to the root. Every node is created once (unique table), so
+    two functions are equal iff their nodes are, and the results of the
+    operations are memoised.
+    """
+    def __init__(self):
+        # The leaves sit below every variable
+        self.var = [float("inf"), float("inf")]
+        self.lo = [None, None]
+        self.hi = [None, None]
+        self.unique = dict()
+        self.memo = dict()
+
+    def node(self, v, lo, hi):
+        """ The node testing variable v with the children lo (v false) and hi (v true). """
+        if lo == hi:
+            return lo
+        key = (v, lo, hi)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.var)
+            self.var.append(v)
+            self.lo.append(lo)
+            self.hi.append(hi)
+            self.unique[key] = u
+        return u
+
+    def variable(self, v):
+        return self.node(v, FALSE, TRUE)
+
+    def neg(self, u):
+        if u <= TRUE:
+            return 1 - u
+        # Children are negated before their parents, with an explicit stack
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if ("not", w) in self.memo:
+                stack.pop()
+                continue
+            pending = [c for c in (self.lo[w], self.hi[w]) if c > TRUE and ("not", c) not in self.memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            lo, hi = (1 - c if c <= TRUE else self.memo[("not", c)] for c in (self.lo[w], self.hi[w]))
+            self.memo[("not", w)] = self.node(self.var[w], lo, hi)
+        return self.memo[("not", u)]
+
+    def conj(self, u, w):
+        return self.__apply("and", u, w)
+
+    def disj(self, u, w):
+        return self.__apply("or", u, w)
+
+    def __known(self, op, u, w):
+        """ The result of op on u and w if it is trivial or memoised, else None. """
+        if op == "and":
+            if u == FALSE or w == FALSE:
+                return FALSE
+            if u == TRUE or u == w:
+                return w
+            if w == TRUE:
+                return u
+        else:
+            if u == TRUE or w == TRUE:
+                return TRUE
+            if u == FALSE or u == w:
+                return w
+            if w == FALSE:
+                return u
+        return self.memo.get((op, u, w) if u < w else (op, w, u))
+
+    def __apply(self, op, u, w):
+        """ Applies op to u and w, the pairs of cofactors before their parents,
+        with an explicit stack, so the depth of the diagrams is not limited
+        by the recursion limit. """
+        r = self.__known(op, u, w)
+        if r is not None:
+            return r
+        stack = [(u, w)]
+        while stack:
+            a, b = stack[-1]
+            if self.__known(op, a, b) is not None:
+                stack.pop()
+                continue
+            va, vb = self.var[a], self.var[b]
+            v = min(va, vb)
+            alo, ahi = (self.lo[a], self.hi[a]) if va == v else (a, a)
+            blo, bhi = (self.lo[b], self.hi[b]) if vb == v else (b, b)
+            lo, hi = self.__known(op, alo, blo), self.__known(op, ahi, bhi)
+            if lo is None or hi is None:
+                if lo is None:
+                    stack.append((alo, blo))
+                if hi is None:
+                    stack.append((ahi, bhi))
+                continue
+            stack.pop()
+            self.memo[(op, a, b) if a < b else (op, b, a)] = self.node(v, lo, hi)
+        return self.__known(op, u, w)
+
+    def compile(self, formula, variables):
+        """ The node of a formula built from atoms, Bool, Not, And, Or, Impl and BiImpl.
+
+        Chains of conjunctions (disjunctions) are compiled as one n-ary
+        operation, whose operands are combined from the lowest top
+        variable up. Combining a node with one whose variables are all
+        below it only copies a path, while combining in the order of a
+        chain like And(And(a, b), c) walks the whole diagram built so far
+        for every operand.
+
+        Keyword arguments:
+        formula --- The formula
+        variables --- A dict from the atoms to their variables
+        """
+        def children(f):
+            if isinstance(f, Not):
+                return [f.f1]
+            if isinstance(f, (And, Or)):
+                return _operands(f)
+            if isinstance(f, (Impl, BiImpl)):
+                return [f.f1, f.f2]
+            return []
+
+        def combine(f, args):
+            if isinstance(f, Not):
+                return self.neg(args[0])
+            if isinstance(f, (And, Or)):
+                args = sorted(args, key = lambda u: self.var[u], reverse = True)
+                return reduce(self.conj if isinstance(f, And) else self.disj, args)
+            if isinstance(f, Impl):
+                return self.disj(self.neg(args[0]), args[1])
+            if isinstance(f, BiImpl):
+                return self.disj(self.conj(*args), self.conj(self.neg(args[0]), self.neg(args[1])))
+            value = _constant(f)
+            if value is not None:
+                return TRUE if value else FALSE
+            return self.variable(variables[f])
+
+        return _postorder(formula, children, combine)
+
+    def count(self, u, n):
+        """ The number of assignments to the variables 1, ..., n that
+        lead from u to TRUE. An edge skipping k variables stands for 2^k
+        assignments, so the count is a sum over the nodes below u. """
+        def level(w):
+            return n + 1 if w <= TRUE else self.var[w]
+
+        counts = {FALSE: 0, TRUE: 1}
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w in counts:
+                stack.pop()
+                continue
+            lo, hi = self.lo[w], self.hi[w]
+            pending = [c for c in (lo, hi) if c not in counts]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            counts[w] = counts[lo] * 2**(level(lo) - level(w) - 1) + counts[hi] * 2**(level(hi) - level(w) - 1)
+        return counts[u] * 2**(level(u) - 1)
+
+    def iter_cubes(self, u):
+        """ Yields the paths from u to TRUE as lists of integer literals
+        (v if variable v is true on the path, -v if it is false),
+        ordered by variable. """
+        path = []
+        # Each frame is (node, length of the path above it, literal leading to it)
+        stack = [(u, 0, None)]
+        while stack:
+            u, depth, literal = stack.pop()
+            del path[depth:]
+            if literal is not None:
+                path.append(literal)
+            if u == TRUE:
+                yield list(path)
+            elif u != FALSE:
+                v = self.var[u]
+                if self.hi[u] != FALSE:
+                    stack.append((self.hi[u], len(path), v))
+                if self.lo[u] != FALSE:
+                    stack.append((self.lo[u], len(path), -v))
+
+
+def occurrence_order(formula):
+    """ The atoms of a formula in order of first occurrence. Everything below
+    the propositional connectives, e.g., Causes('a', 'b'), counts as an atom,
+    the constants True and False do not. """
+    order = dict()
+    stack = [formula]
+    while stack:
+        f = stack.pop()
+        if isinstance(f, (And, Or, Impl, BiImpl)):
+            stack.extend([f.f2, f.f1])
+        elif isinstance(f, Not):
+            stack.append(f.f1)
+        elif not isinstance(f, Bool):
+            order.setdefault(f, None)
+    return list(order)
+
+
+def iter_cubes(formula, atoms):
+    """
+    Yields cubes covering the models of a formula, as lists of integer
+    literals where i + 1 stands for the i-th atom and -(i + 1) for its
+    negation, sorted by atom. The cubes are pairwise disjoint, and atoms
+    not occurring in a cube can take either value.
+
+    The diagram tests the atoms in order of their first occurrence in the
+    formula, which keeps atoms of the same subformula close together. On
+    conjunctions of small clauses this yields exponentially fewer paths
+    than an arbitrary order, similar to the dynamic reordering of the
+    extension.
+
+    Keyword arguments:
+    formula --- A formula built from the atoms with Not, And, Or, Impl and BiImpl
+    atoms --- The atoms of the formula
+    """
+    index = {a: i + 1 for i, a in enumerate(atoms)}
+    order = [a for a in occurrence_order(formula) if a in index]
+    seen = set(order)
+    order += [a for a in atoms if a not in seen]
+    bdd = BDD()
+    u = bdd.compile(formula, {a: level + 1 for level, a in enumerate(order)})
+    for path in bdd.iter_cubes(u):
+        cube = [index[order[l - 1]] if l > 0 else -index[order[-l - 1]] for l in path]
+        cube.sort(key = abs)
+        yield cube
+
+
+def sat(formula, atoms):
+    """
+    The cubes covering the models of a formula as dicts from atoms to
+    truth values, like ethics.extensions.sat.sat.
+
+    >>> sat(Or("a", "b"), ["a", "b"])
+    [{'a': False, 'b': True}, {'a': True}]
+    """
+    atoms = list(atoms)
+    return [{atoms[abs(l) - 1]: l > 0 for l in cube} for cube in iter_cubes(formula, atoms)]
@@ -129,20 +129,25 @@ class ArgModel:
         tokens.reverse()
         return tokens
 
+    def construct(name, *args):
+        if name in constructors:
+            return constructors[name](*args)
+        return Atom(name + "(" + ", ".join(map(repr, args)) + ")")
+
     def parseFormula(string):
         pol = ArgModel.polish(string)
         myStack = list()
         for p in pol:
             if p in ["Top", "Bottom"]:
-                myStack.append(my_eval(p + "()"))
+                myStack.append(ArgModel.construct(p))
             elif p in ["Good", "Bad", "Neutral", "Not", "Atom"]:
-                myStack.append(my_eval(p + "(" + repr(myStack.pop()) + ")"))
+                myStack.append(ArgModel.construct(p, myStack.pop()))
             elif p in ["And", "Because", "Same", "Or", "Impl", "BiImpl", "Causes", "Intervene"]:
-                myStack.append(my_eval(p + "(" + repr(myStack.pop()) + ", " + repr(myStack.pop()) + ")"))
+                myStack.append(ArgModel.construct(p, myStack.pop(), myStack.pop()))
             elif p in ["Forall", "Exists"]:
                 first = myStack.pop()
                 second = myStack.pop()
-                myStack.append(my_eval(p + "(" + repr(first) + ", " + repr(second) + ")"))
+                myStack.append(ArgModel.construct(p, first, second))
                 #omitted: first.variable = True
             elif(p[0:4] == 'Act[' and len(p.split('/')) == 2):
                     myStack.append(Atom(p[0: -1]+"/]"))
@@ -168,7 +173,15 @@ class Argument:
         self.support = support
         self.claim = claim
 
-    def undercuts(self, argument):
+    def session(self):
+        """A solver session holding the support and claim of this argument."""
+        s = BDDSolver(theory = True)
+        s.append_formula(ArgSolver.toConjunction(self.support + self.claim))
+        return s
+
+    def undercuts(self, argument, session = None):
+        if session is not None:
+            return not session.satisfiable(ArgSolver.toConjunction(argument.support))
         support, claim, argumentSupport = self.support, self.claim, argument.support
         newList = support.copy()
         newList.extend(claim)
@@ -176,7 +189,9 @@ class Argument:
         newFormula = ArgSolver.toConjunction(newList)
         return not satisfiable(newFormula)
     
-    def rebuts(self, argument):
+    def rebuts(self, argument, session = None):
+        if session is not None:
+            return not session.satisfiable(ArgSolver.toConjunction(argument.claim))
         support, claim, argumentClaim = self.support, self.claim, argument.claim
         newList = support.copy()
         newList.extend(claim)
@@ -293,14 +308,15 @@ class ArgGraph:
         self.addAttacks(argument)
 
     def addAttacks(self, argument):
+        session = argument.session()
         for a in self.arguments:
             if a.undercuts(argument):
                 if all(repr(att) != repr(Undercut(a, argument)) for att in self.attacks) or len(self.attacks) == 0:
                     self.attacks.append(Undercut(a, argument))
-            if argument.undercuts(a):
+            if argument.undercuts(a, session):
                 if all(repr(att) != repr(Undercut(argument, a)) for att in self.attacks) or len(self.attacks) == 0:
                     self.attacks.append(Undercut(argument, a))
-            if argument.rebuts(a):
+            if argument.rebuts(a, session):
                 if all(repr(att) != repr(Rebut(argument, a)) for att in self.attacks) or len(self.attacks) == 0:
                     self.attacks.append(Rebut(argument, a))
                     self.attacks.append(Rebut(a, argument))
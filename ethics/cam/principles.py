@@ -1,7 +1,7 @@
 from ethics.cam.semantics import *
 from ethics.language import *
 from ethics.tools import *
-from ethics.explanations import generate_reasons, generate_inus_reasons
+from ethics.explanations import generate_reasons, generate_inus_reasons, anytime_reasons, Budget
 #from ethics.argumentation import ArgModel, ArgGraph, ArgSolver
 
 class Principle(object):
@@ -17,6 +17,8 @@ class Principle(object):
         self.counter = 0
         self.label = ""
         self.is_permissible = None
+        # Suspended search of explain with a budget
+        self.anytime = None
         
     def buildConjunction(self):
         return Formula.makeConjunction(self.formulae)
@@ -27,14 +29,30 @@ class Principle(object):
     def permissible(self):
         pass
 
-    def explain(self):
-        reasons = generate_reasons(self.model, self)
+    def explain(self, k = None, budget = None):
+        """ Sufficient, necessary and INUS reasons, only the k shortest of each kind unless k is None.
+
+        With a budget (seconds or a Budget), the reasons are searched like
+        with k, shortest first, and the search stops when the budget is
+        exhausted. The result then has "complete" set to False, and calling
+        explain with a budget and the same k again continues the search.
+        """
+        if budget is not None:
+            if self.anytime is None or self.anytime.k != k:
+                self.anytime = anytime_reasons(self.model, self, k = k)
+            reasons = self.anytime.run(budget if isinstance(budget, Budget) else Budget(seconds = budget))
+        else:
+            reasons = generate_reasons(self.model, self, k = k)
         suff = {r["reason"] for r in reasons if r["type"] == "sufficient"}
         nec = {r["reason"] for r in reasons if r["type"] == "necessary"}
         inus = generate_inus_reasons(reasons)
         if len(reasons) > 0:
-            return {"permissible": reasons[0]["perm"], "principle": self.label, "sufficient": suff, "necessary": nec, "inus": inus}
-        return {"permissible": self.permissible(), "principle": self.label, "sufficient": set(), "necessary": set(), "inus": set()}
+            result = {"permissible": reasons[0]["perm"], "principle": self.label, "sufficient": suff, "necessary": nec, "inus": inus}
+        else:
+            result = {"permissible": self.permissible(), "principle": self.label, "sufficient": set(), "necessary": set(), "inus": set()}
+        if budget is not None:
+            result["complete"] = self.anytime.complete
+        return result
 
 class DoubleEffectPrinciple(Principle):
     """
@@ -65,15 +65,29 @@ class CausalNetwork(Model):
             self.compute_layers(1)
         else:
             handled_vars = merge_lists(self.layers.values())
-            handled_vars_formula = self.__make_representative_formula(handled_vars)
             unhandled_vars = set(self.endoVars) - set(handled_vars)
             if len(unhandled_vars) > 0:
                 self.layers[layer] = set()
-                for v in unhandled_vars:
-                    v_formula = self.__make_representative_formula_of_equations([v])
-                    if self.models(v) and entails(And(handled_vars_formula, v_formula), v) or \
-                            self.models(Not(v)) and entails(And(handled_vars_formula, v_formula), Not(v)):
-                        self.layers[layer].add(v)
+                premise = self.__make_representative_formula(handled_vars)
+                equations = {v: self.__make_representative_formula_of_equations([v]) for v in unhandled_vars}
+                network = And(premise, Formula.makeConjunction(list(equations.values())))
+                if truthtable is not None and len(truthtable.leaves(network)) <= TRUTHTABLE_MAX_ATOMS:
+                    # Small networks: all entailment checks on one table
+                    table = truth_table(network)
+                    for v in unhandled_vars:
+                        if self.models(v) and table.entails(And(premise, equations[v]), v) or \
+                                self.models(Not(v)) and table.entails(And(premise, equations[v]), Not(v)):
+                            self.layers[layer].add(v)
+                else:
+                    session = BDDSolver(theory = True)
+                    session.append_formula(premise)
+                    for v in unhandled_vars:
+                        session.push()
+                        session.append_formula(equations[v])
+                        if self.models(v) and session.entails(v) or \
+                                self.models(Not(v)) and session.entails(Not(v)):
+                            self.layers[layer].add(v)
+                        session.pop()
                 self.compute_layers(layer + 1)
         return self.layers
                 
@@ -320,12 +334,12 @@ class CausalModel(CausalNetwork):
     def get_performed_actions(self):
         return [e for e in self.actions if self.models(e)]
         
-    def explain(self, principle):
+    def explain(self, principle, k = None, budget = None):
         try:
             p = principle(self)
         except:
             p = principle
-        return p.explain()
+        return p.explain(k = k, budget = budget)
         
     def models(self, f):
         if isinstance(f, Caused):
@@ -0,0 +1,226 @@
+import heapq
+
+
+class CDCLSolver():
+    """ A small conflict-driven clause-learning SAT solver.
+
+    Clauses are lists of non-zero integers in DIMACS convention. The
+    solver uses two watched literals, first-UIP learning with
+    non-chronological backjumping, VSIDS-style activities, phase saving
+    and restarts. Clauses can be added between calls to solve(), so
+    models can be enumerated by adding blocking clauses, and solve()
+    accepts assumptions that hold for that call only.
+
+    Keyword arguments:
+    clauses --- An iterable of clauses
+    """
+    def __init__(self, clauses = ()):
+        self.nvars = 0
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [-1]
+        self.watches = {}
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.order = []
+        self.increment = 1.0
+        self.ok = True
+        for c in clauses:
+            self.add_clause(c)
+
+    def add_clause(self, clause):
+        """ Adds a clause. Returns False if the clauses became unsatisfiable. """
+        self.__cancel_until(0)
+        if not self.ok:
+            return False
+        lits = set(clause)
+        for l in lits:
+            self.__grow(abs(l))
+        if any(-l in lits for l in lits):
+            return True
+        lits = [l for l in lits if self.__value(l) != -1]
+        if any(self.__value(l) == 1 for l in lits):
+            return True
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.__enqueue(lits[0], None)
+            self.ok = self.__propagate() is None
+        else:
+            self.__watch(lits)
+        return self.ok
+
+    def solve(self, assumptions = ()):
+        """ Returns a model as dict from variables to booleans, or None if there is none. """
+        self.__cancel_until(0)
+        if not self.ok:
+            return None
+        for l in assumptions:
+            self.__grow(abs(l))
+        assumptions = list(assumptions)
+        conflicts = 0
+        restart = 100
+        while True:
+            conflict = self.__propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.ok = False
+                    return None
+                learnt, level = self.__analyze(conflict)
+                self.__cancel_until(level)
+                if len(learnt) == 1:
+                    self.__enqueue(learnt[0], None)
+                else:
+                    self.__watch(learnt)
+                    self.__enqueue(learnt[0], learnt)
+                self.increment /= 0.95
+                conflicts += 1
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart = int(restart * 1.5)
+                    self.__cancel_until(0)
+                continue
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                l = assumptions[level]
+                value = self.__value(l)
+                if value == -1:
+                    return None
+                self.trail_lim.append(len(self.trail))
+                if value == 0:
+                    self.__enqueue(l, None)
+                continue
+            v = self.__pick()
+            if v is None:
+                return {v: self.values[v] == 1 for v in range(1, self.nvars + 1)}
+            self.trail_lim.append(len(self.trail))
+            self.__enqueue(v * self.phase[v], None)
+
+    def __grow(self, v):
+        while self.nvars < v:
+            self.nvars += 1
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phase.append(-1)
+            heapq.heappush(self.order, (0.0, self.nvars))
+
+    def __value(self, l):
+        return self.values[l] if l > 0 else -self.values[-l]
+
+    def __watch(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def __enqueue(self, l, reason):
+        v = abs(l)
+        self.values[v] = 1 if l > 0 else -1
+        self.levels[v] = len(self.trail_lim)
+        self.reasons[v] = reason
+        self.trail.append(l)
+
+    def __propagate(self):
+        """ Unit propagation, returns a falsified clause or None. """
+        values = self.values
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = self.watches.get(false_lit, [])
+            kept = []
+            for i, c in enumerate(watching):
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], c[0]
+                first = c[0]
+                if (values[first] if first > 0 else -values[-first]) == 1:
+                    kept.append(c)
+                    continue
+                for k in range(2, len(c)):
+                    l = c[k]
+                    if (values[l] if l > 0 else -values[-l]) != -1:
+                        c[1], c[k] = l, false_lit
+                        self.watches.setdefault(l, []).append(c)
+                        break
+                else:
+                    kept.append(c)
+                    if (values[first] if first > 0 else -values[-first]) == -1:
+                        kept.extend(watching[i + 1:])
+                        self.watches[false_lit] = kept
+                        self.qhead = len(self.trail)
+                        return c
+                    self.__enqueue(first, c)
+            self.watches[false_lit] = kept
+        return None
+
+    def __analyze(self, conflict):
+        """ First-UIP learning, returns the learnt clause and the level to jump back to. """
+        level = len(self.trail_lim)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        p = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if p is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.__bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            p = self.trail[index]
+            index -= 1
+            seen.discard(abs(p))
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(p)]
+        learnt[0] = -p
+        if len(learnt) == 1:
+            return learnt, 0
+        i = max(range(1, len(learnt)), key = lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[i] = learnt[i], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def __bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[u], u) for u in range(1, self.nvars + 1)]
+            heapq.heapify(self.order)
+        else:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def __pick(self):
+        """ The unassigned variable of highest activity, or None. """
+        while self.order:
+            _, v = heapq.heappop(self.order)
+            if self.values[v] == 0:
+                return v
+        for v in range(1, self.nvars + 1):
+            if self.values[v] == 0:
+                return v
+        return None
+
+    def __cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for l in self.trail[start:]:
+            v = abs(l)
+            self.phase[v] = 1 if l > 0 else -1
+            self.values[v] = 0
+            self.reasons[v] = None
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
@@ -1,68 +1,193 @@
-from ethics.language import Formula, Not
-from ethics.solver import satisfiable, smt_all_models
-from ethics.tools import my_eval
-from ethics.extensions.mhsModule import hitting_sets as mhs_new
-#from ethics.extensions.mhs import mhs as mhs_new
-
-def hitting_sets_gde(sets):
-    sets = sorted(sets, key=len)
-    sets_new = []
-    for s in sets:
-        new_set = []
-        for f in s:
-            new_set.append(str(f))
-        sets_new.append(new_set)
-    mhs = mhs_new(sets_new)
-    result = []
-    for m in mhs:
-        r = []
-        for f in m:
-            r.append(my_eval(f))
-        result.append(r)
-    return result
+from ethics.language import Formula, Not, serialize
+from ethics.solver import theory_atoms, QueryCache
+from ethics.tools import rename_atoms, canonical_atoms
+from ethics.primes import compile_primes, hitting_sets_gde, complement, is_literal, consistent_terms, \
+    remove_trivial_clauses, remove_unsatisfiable_terms, exact_strategies, iter_hitting_sets, literal_order, iter_prime_implicants, \
+    iter_prime_implicates, prime_implicant_steps, prime_implicate_steps
+import hashlib
+import os
+import pickle
+import time
 
 
+def compute_primes(formula, strategy = "bdd"):
+    """ The prime implicants and implicates of a formula modulo the Simple
+    CAL axioms, see ethics.primes.compile_primes for the strategies. The
+    default "bdd" is exact. The "dualise" strategy, which the explanations
+    used before, may miss primes and keep literals the axioms make
+    redundant, so some of its reasons are not prime. """
+    return compile_primes(formula, strategy)
 
-def remove_trivial_clauses(clauses):
-    r = []
-    for c in clauses:
-        if satisfiable(Not(Formula.makeDisjunction(c))):
-            r.append(c)
-    return r
 
-def remove_unsatisfiable_terms(terms):
-    r = []
-    for t in terms:
-        if satisfiable(Formula.makeConjunction(t)):
-            r.append(t)
-    return r
+class PrimeCache():
+    """ The primes of formulae, keyed by their shape.
 
-def compute_primes(formula):
-    models = smt_all_models(formula)
-    prime_implicates = remove_trivial_clauses(hitting_sets_gde(models))
-    prime_implicants = remove_unsatisfiable_terms(hitting_sets_gde(prime_implicates))
-    return prime_implicants, prime_implicates
+    A principle builds formulae of the same shape for many situations,
+    only the atoms differ. The primes are stored for the canonical form
+    of the formula (see canonical_atoms) and renamed back on a hit, so
+    compute_primes runs once per shape. The Simple CAL axioms only compare
+    atoms for equality, hence renaming the atoms renames the exact primes.
+    Which primes "dualise" finds depends on the names of the atoms, so
+    with this strategy the primes are computed for every formula and
+    neither kept in memory nor stored.
 
+    Keyword arguments:
+    maxsize --- The number of shapes kept in memory, 0 disables the cache
+    directory --- If given, the primes are also stored in files in this directory
+    strategy --- The strategy of compute_primes
+    """
+    def __init__(self, maxsize = 256, directory = None, strategy = "bdd"):
+        self.entries = QueryCache(maxsize)
+        self.directory = directory
+        self.strategy = strategy
 
-def generate_reasons(model, principle, *args):
-    perm = principle.permissible()
+    def primes(self, formula):
+        """ The prime implicants and implicates of a formula, like compute_primes. """
+        if self.strategy not in exact_strategies:
+            return compute_primes(formula, self.strategy)
+        canonical, back = canonical_atoms(formula)
+        primes = self.entries.get(canonical)
+        if primes is None:
+            primes = self.__load(canonical)
+            if primes is None:
+                # Computed for the formula itself, so a miss returns what compute_primes does
+                cants, cates = compute_primes(formula, self.strategy)
+                forth = {a: c for c, a in back.items()}
+                primes = self.__rename((cants, cates), forth)
+                self.__store(canonical, primes)
+                self.entries.put(canonical, primes)
+                return cants, cates
+            self.entries.put(canonical, primes)
+        return self.__rename(primes, back)
+
+    def __rename(self, primes, renaming):
+        literals = dict()
+
+        def rename(l):
+            if l not in literals:
+                literals[l] = rename_atoms(l, lambda a: renaming.get(a, a))
+            return literals[l]
+
+        return tuple([[rename(l) for l in p] for p in ps] for ps in primes)
+
+    def __path(self, canonical):
+        return os.path.join(self.directory, hashlib.sha1(serialize([canonical])).hexdigest() + "-" + self.strategy + ".primes")
+
+    def __load(self, canonical):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.__path(canonical), "rb") as f:
+                shape, primes = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        return primes if shape == canonical else None
+
+    def __store(self, canonical, primes):
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok = True)
+        path = self.__path(canonical)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump((canonical, primes), f)
+        os.replace(path + ".tmp", path)
+
+    def info(self):
+        return self.entries.info()
+
+    def clear(self):
+        self.entries.clear()
+
+# Used by generate_reasons
+prime_cache = PrimeCache()
 
-    # Compute prime implicants and prime implicates
+def prime_cache_info():
+    """ Hits, misses, maximal and current size of the in-memory prime cache. """
+    return prime_cache.info()
+
+def prime_cache_clear():
+    """ Empties the in-memory prime cache, files on disk are kept. """
+    prime_cache.clear()
+
+def set_prime_cache(maxsize = None, directory = None, strategy = None):
+    """ Sets the number of shapes kept in memory, the directory for
+    storing primes on disk and the strategy of compute_primes (None keeps
+    the current setting, a directory of "" disables storing). """
+    if maxsize is not None:
+        prime_cache.entries.resize(maxsize)
+    if directory is not None:
+        prime_cache.directory = directory or None
+    if strategy is not None and strategy != prime_cache.strategy:
+        prime_cache.strategy = strategy
+        prime_cache.clear()
+
+
+class Valuation():
+    """ The truth values of literals in a model.
+
+    Every atom is passed to model.models() at most once, the values of
+    literals and conjunctions of literals are then read from the set of
+    true literals. Checking a formula on a plan situation may simulate the
+    plan, e.g., for Caused or Instrumental, so the primes are scored at the
+    cost of their distinct atoms rather than of their literals.
+
+    Keyword arguments:
+    model --- The model (a causal model or a situation)
+    """
+    def __init__(self, model):
+        self.model = model
+        self.true = set()
+        self.atoms = set()
+
+    def holds(self, l):
+        """ Whether the model satisfies the literal l. """
+        if not is_literal(l):
+            return self.model.models(l)
+        a = l.f1 if isinstance(l, Not) else l
+        if a not in self.atoms:
+            self.atoms.add(a)
+            self.true.add(a if self.model.models(a) else Not(a))
+        return l in self.true
+
+    def satisfies(self, term):
+        """ Whether the model satisfies the conjunction of a list of literals. """
+        if not term:
+            return self.model.models(Formula.makeConjunction(term))
+        return all(self.holds(l) for l in term)
+
+
+def principle_formula(principle):
+    """ Whether the principle permits its model, and the formula to explain:
+    the principle's conjunction if it does, its negation otherwise. """
+    perm = principle.permissible()
     if perm:
-        cants, cates = compute_primes(principle.buildConjunction().nnf())
-    else:
-        cants, cates = compute_primes(Not(principle.buildConjunction()).nnf())
+        return perm, principle.buildConjunction().nnf()
+    return perm, Not(principle.buildConjunction()).nnf()
+
+
+def generate_reasons(model, principle, *args, k = None):
+    perm, formula = principle_formula(principle)
+    if k is not None:
+        return generate_shortest_reasons(model, perm, formula, k)
+
+    # Compute prime implicants and prime implicates, once per shape of formula
+    cants, cates = prime_cache.primes(formula)
+
+    # Each atom of the primes is evaluated in the model once
+    valuation = Valuation(model)
+
+    # The literals of the reasons are ordered like those of
+    # generate_shortest_reasons, by first occurrence in the formula and not
+    # in the order of the primes, so the same reason is the same formula
+    key = literal_order(formula)
 
     # Sufficient reasons from prime implicants
-    suff = {Formula.makeConjunction(c) for c in cants if model.models(Formula.makeConjunction(c))}
+    suff = {Formula.makeConjunction(sorted(c, key = key)) for c in cants if valuation.satisfies(c)}
 
     # Necessary reasons from prime implicates
     necc = set()
     for cc in cates:
-        necc_reason = []
-        for c in cc:
-            if model.models(c):
-                necc_reason.append(c)
+        necc_reason = sorted([c for c in cc if valuation.holds(c)], key = key)
         if len(necc_reason) > 0:
             necc.add(Formula.makeDisjunction(necc_reason))
 
@@ -76,14 +201,139 @@ def generate_reasons(model, principle, *args):
     return result
 
 
+def generate_shortest_reasons(model, perm, formula, k):
+    """
+    Like generate_reasons, but only the k shortest sufficient reasons and
+    the necessary reasons from the shortest prime implicates, at most k of
+    each. The primes are enumerated in increasing size and the enumeration
+    stops as soon as there are enough reasons. With k at least the number
+    of reasons, these are the reasons of generate_reasons.
+    """
+    return AnytimeReasons(model, perm, formula, k).run()
+
+
+class Budget():
+    """ A limit on the work of AnytimeReasons.run.
+
+    Keyword arguments:
+    seconds --- Wall-clock time from now, None for no limit
+    steps --- Number of steps, None for no limit
+    """
+    def __init__(self, seconds = None, steps = None):
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.steps = steps
+        self.spent = 0
+
+    def spend(self):
+        self.spent += 1
+
+    def exhausted(self):
+        if self.steps is not None and self.spent >= self.steps:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+class AnytimeReasons():
+    """ The reasons of generate_shortest_reasons, found step by step.
+
+    The prime implicants and the prime implicates are enumerated in
+    increasing size by two generators, which take turns. A step advances
+    one of them by a solver call or a step of its hitting set search, so
+    the budget is checked between these but a single call is never
+    interrupted. run() returns the reasons found so far. The generators
+    stay suspended, so the next run() continues where the last one
+    stopped, until complete.
+
+    Keyword arguments:
+    model --- The model
+    perm --- Whether the principle permits the model
+    formula --- The formula to explain (see principle_formula)
+    k --- The number of reasons of each kind, None for all
+    """
+    def __init__(self, model, perm, formula, k = None):
+        self.model = model
+        self.perm = perm
+        self.formula = formula
+        self.k = k
+        self.valuation = Valuation(model)
+        self.sufficient = []
+        self.necessary = []
+        self.streams = None
+
+    @property
+    def complete(self):
+        return self.streams == []
+
+    def run(self, budget = None):
+        """ Takes steps until all reasons are found or the budget is exhausted,
+        returns the reasons found so far like generate_reasons. """
+        if budget is None:
+            budget = Budget()
+        if self.streams is None:
+            literals = {a if self.valuation.holds(a) else Not(a) for a in theory_atoms(self.formula)}
+            self.streams = [] if self.k == 0 else [
+                (self.__sufficient, prime_implicant_steps(self.formula, literals)),
+                (self.__necessary, prime_implicate_steps(self.formula))]
+            budget.spend()
+        while self.streams and not budget.exhausted():
+            add, stream = self.streams.pop(0)
+            prime = next(stream, False)
+            budget.spend()
+            if prime is False or prime is not None and not add(prime):
+                continue
+            self.streams.append((add, stream))
+        return self.reasons()
+
+    def __sufficient(self, t):
+        """ Records a prime implicant, returns whether more are needed. """
+        if self.valuation.satisfies(t):
+            self.sufficient.append(Formula.makeConjunction(t))
+        return self.k is None or len(self.sufficient) < self.k
+
+    def __necessary(self, cc):
+        """ Records a prime implicate, returns whether more are needed. """
+        necc_reason = [c for c in cc if self.valuation.holds(c)]
+        if len(necc_reason) > 0 and Formula.makeDisjunction(necc_reason) not in self.necessary:
+            self.necessary.append(Formula.makeDisjunction(necc_reason))
+        return self.k is None or len(self.necessary) < self.k
+
+    def reasons(self):
+        result = []
+        for c in self.sufficient:
+            result.append({"model": self.model, "perm": self.perm, "reason": c, "type": "sufficient"})
+        for c in self.necessary:
+            result.append({"model": self.model, "perm": self.perm, "reason": c, "type": "necessary"})
+        return result
+
+
+def anytime_reasons(model, principle, k = None):
+    """ An AnytimeReasons for the principle, which has not taken any steps yet. """
+    perm, formula = principle_formula(principle)
+    return AnytimeReasons(model, perm, formula, k)
+
+
 def generate_inus_reasons(reasons):
+    """
+    The necessary reasons whose literals all occur in one sufficient
+    reason. Each literal is mapped to the bitset of the sufficient reasons
+    containing it, so a necessary reason is matched by intersecting the
+    bitsets of its literals.
+    """
     suff = {r["reason"] for r in reasons if r["type"] == "sufficient"}
     nec = {r["reason"] for r in reasons if r["type"] == "necessary"}
+    postings = dict()
+    for i, rs in enumerate(suff):
+        for l in rs.getConj():
+            postings[l] = postings.get(l, 0) | 1 << i
+    everything = (1 << len(suff)) - 1
     inus = set()
     for rn in nec:
         rn_check = rn.getClause()
-        for rs in suff:
-            if set(rn_check) <= set(rs.getConj()):
-                inus.add(Formula.makeDisjunction(rn_check))
+        common = everything
+        for l in rn_check:
+            common &= postings.get(l, 0)
+            if not common:
                 break
-    return inus
\ No newline at end of file
+        if common:
+            inus.add(Formula.makeDisjunction(rn_check))
+    return inus
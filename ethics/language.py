@@ -1,42 +1,385 @@
+import weakref
+import struct
+import sys
+from array import array
+
+# Table of all live formula and term nodes, keyed by their structure.
+_interned = weakref.WeakValueDictionary()
+
+
+def _canonical(x):
+    """Plain strings occurring inside formulae and terms are atoms."""
+    if type(x) is str:
+        return Atom(x)
+    return x
+
+
+def _key(x):
+    """Interned nodes stand for themselves, everything else is keyed by type and value."""
+    if isinstance(x, (Formula, Term)) and not isinstance(x, str):
+        return x
+    return (x.__class__, x)
+
+
+def _intern(cls, a, b, names):
+    """
+    Return the unique node of class cls with children a and b.
+    The node is created on first use, its hash is computed once.
+    """
+    a = _canonical(a)
+    b = _canonical(b)
+    key = (cls, _key(a), _key(b))
+    node = _interned.get(key)
+    if node is None:
+        node = object.__new__(cls)
+        object.__setattr__(node, names[0], a)
+        object.__setattr__(node, names[1], b)
+        object.__setattr__(node, "_hash", hash(key))
+        _interned[key] = node
+    return node
+
+
+def _constant(f):
+    """The truth value of the constants True and False (as bool or Bool), None for other formulae."""
+    if isinstance(f, bool):
+        return f
+    if isinstance(f, Bool):
+        if f.f1 is True or f.f1 == "True":
+            return True
+        if f.f1 is False or f.f1 == "False":
+            return False
+    return None
+
+
+def _operands(f):
+    """The operands of a chain of conjunctions (disjunctions) from left to right."""
+    ops = []
+    stack = [f]
+    while stack:
+        g = stack.pop()
+        if type(g) is type(f):
+            stack.append(g.f2)
+            stack.append(g.f1)
+        else:
+            ops.append(g)
+    return ops
+
+
+def _negation(f):
+    if isinstance(f, Not):
+        return f.f1
+    return Not(f)
+
+
+def _simplify_junction(f, ops):
+    """
+    Simplifies the conjunction (disjunction) f of the already simplified ops.
+    For a conjunction, the neutral constant is True and the dominant one False,
+    and a disjunction among the operands is absorbed by any of its disjuncts
+    (and vice versa for disjunctions).
+    """
+    conjunction = isinstance(f, And)
+    dual = Or if conjunction else And
+    seen = dict()
+    for op in ops:
+        for g in (_operands(op) if type(op) is type(f) else [op]):
+            c = _constant(g)
+            if c is conjunction:
+                continue
+            if c is not None:
+                return Bool(c)
+            seen[g] = None
+    if any(isinstance(g, Not) and g.f1 in seen for g in seen):
+        return Bool(not conjunction)
+    duals = [(g, set(_operands(g))) for g in seen if isinstance(g, dual)]
+    absorbed = {g for g, parts in duals if any(p in seen for p in parts)}
+    if len(duals) <= 500:
+        for i, (g, parts) in enumerate(duals):
+            if g not in absorbed and any(h not in absorbed and (other < parts or other == parts and j < i)
+                                         for j, (h, other) in enumerate(duals) if j != i):
+                absorbed.add(g)
+    ops = [g for g in seen if g not in absorbed]
+    if not ops:
+        return Bool(conjunction)
+    if conjunction:
+        return Formula.makeConjunction(ops)
+    return Formula.makeDisjunction(ops)
+
+
+def _postorder(root, children, combine, key = id):
+    """
+    Evaluates combine(node, results of its children) bottom-up without
+    recursion, once per distinct key(node) (by default the identity), and
+    returns the result for root. children(node) lists the nodes to
+    evaluate first.
+    """
+    results = dict()
+    stack = [root]
+    while stack:
+        node = stack[-1]
+        if key(node) in results:
+            stack.pop()
+            continue
+        kids = children(node)
+        pending = [k for k in kids if key(k) not in results]
+        if pending:
+            stack.extend(reversed(pending))
+            continue
+        stack.pop()
+        results[key(node)] = combine(node, [results[key(k)] for k in kids])
+    return results[key(root)]
+
+
+def _nnf_step(f, negated):
+    """
+    One step of the negation normal form of f (of Not(f) if negated): the
+    (subformula, negated) pairs it depends on and how to combine their forms.
+    """
+    if not negated:
+        if isinstance(f, Not):
+            return [(f.f1, True)], lambda r: r[0]
+        if isinstance(f, And):
+            return [(f.f1, False), (f.f2, False)], lambda r: And(r[0], r[1])
+        if isinstance(f, Or):
+            return [(f.f1, False), (f.f2, False)], lambda r: Or(r[0], r[1])
+        if isinstance(f, Impl):
+            return [(f.f1, True), (f.f2, False)], lambda r: Or(r[0], r[1])
+        if isinstance(f, BiImpl):
+            return [(f.f1, False), (f.f2, False), (f.f1, True), (f.f2, True)], \
+                lambda r: Or(And(r[0], r[1]), And(r[2], r[3]))
+        return [], lambda r: f
+    if isinstance(f, Bool):
+        return [], lambda r: Bool(not f.f1)
+    if isinstance(f, Not):
+        return [(f.f1, False)], lambda r: r[0]
+    if isinstance(f, And):
+        return [(f.f1, True), (f.f2, True)], lambda r: Or(r[0], r[1])
+    if isinstance(f, Or):
+        return [(f.f1, True), (f.f2, True)], lambda r: And(r[0], r[1])
+    if isinstance(f, Impl):
+        return [(f.f1, False), (f.f2, True)], lambda r: And(r[0], r[1])
+    if isinstance(f, BiImpl):
+        return [(f.f1, True), (f.f2, True), (f.f1, False), (f.f2, False)], \
+            lambda r: And(Or(r[0], r[1]), Or(r[2], r[3]))
+    return [], lambda r: Not(f)
+
+
+def _cnf_step(f):
+    """ The subformulae one step of cnf_it on f depends on, and the connective joining their results. """
+    if isinstance(f, Or) and isinstance(f.f1, And):
+        return [Or(f.f1.f1, f.f2), Or(f.f1.f2, f.f2)], And
+    if isinstance(f, Or) and isinstance(f.f2, And):
+        return [Or(f.f1, f.f2.f1), Or(f.f1, f.f2.f2)], And
+    if isinstance(f, (And, Or)):
+        return [f.f1, f.f2], type(f)
+    return [], None
+
+
+def _chain(f, descend):
+    """ The maximal subformulae of f not satisfying descend, left to right. """
+    result = []
+    stack = [f]
+    while stack:
+        g = stack.pop()
+        if descend(g):
+            stack.extend([g.f2, g.f1])
+        else:
+            result.append(g)
+    return result
+
+
+# Strings of subformulae up to this length are cached on the nodes
+REPR_CACHE_LIMIT = 4096
+
+_templates = dict()
+
+
+def _template(cls):
+    """ The opening, separating and closing text of the repr of nodes of class cls. """
+    template = _templates.get(cls)
+    if template is None:
+        if issubclass(cls, TwoPlacedTerm):
+            template = (cls.__name__ + "(", ", +", ")")
+        elif issubclass(cls, TwoPlaced):
+            template = (cls.__name__ + "(", ", ", ")")
+        else:
+            template = (cls.__name__ + "(", None, ")")
+        _templates[cls] = template
+    return template
+
+
+def _to_string(root):
+    """
+    The repr of a formula or term, written left to right without recursion.
+    The strings of (sub)formulae are cached on the immutable nodes, except
+    for very long ones, and reused by every formula containing them.
+    """
+    cached = root.__dict__.get("_repr")
+    if cached is not None:
+        return cached
+    out = []
+    size = 0
+    stack = [(False, root)]
+    while stack:
+        text, x = stack.pop()
+        if text:
+            if isinstance(x, tuple):
+                node, start, begin = x
+                if size - begin <= REPR_CACHE_LIMIT:
+                    out[start:] = ["".join(out[start:])]
+                    object.__setattr__(node, "_repr", out[-1])
+                continue
+        elif isinstance(x, Bool):
+            x = str(x)
+        elif isinstance(x, str):
+            x = "'"+x+"'"
+        elif isinstance(x, (Formula, Term)):
+            cached = x.__dict__.get("_repr")
+            if cached is None:
+                opening, separator, closing = _template(type(x))
+                args = (x.t1, x.t2) if isinstance(x, Term) else (x.f1, x.f2)
+                stack.append((True, (x, len(out), size)))
+                stack.append((True, closing))
+                if separator is not None:
+                    stack.extend([(False, args[1]), (True, separator)])
+                stack.extend([(False, args[0]), (True, opening)])
+                continue
+            x = cached
+        else:
+            x = str(x)
+        out.append(x)
+        size += len(x)
+    return "".join(out)
+
+
 class Formula(object):
     """
     Classes to programmatically build
     and represent formulae and terms of the language
     specified in Definition 1.
+
+    Formulae are hash-consed and immutable: structurally
+    equal formulae are the very same object, hence equality
+    is an identity check and hashes are computed only once.
     """
-    def __init__(self, f1, f2):
-        self.f1 = f1
-        self.f2 = f2
+    def __eq__(self, other):
+        return self is other
 
-    def nnf(self):
-        if(isinstance(self, Atom)):
-            return self
-        if(isinstance(self, Bool)):
-            return self
-        if(isinstance(self, Not)):
-            if(isinstance(self.f1, Bool)):
-                return Bool(not self.f1.f1)
-            if(isinstance(self.f1, Not)):
-                return self.f1.f1.nnf()
-            if(isinstance(self.f1, And)):
-                return Or(Not(self.f1.f1).nnf(), Not(self.f1.f2).nnf())
-            if(isinstance(self.f1, Or)):
-                return And(Not(self.f1.f1).nnf(), Not(self.f1.f2).nnf())
-            if(isinstance(self.f1, Impl)):
-                return Not(Or(Not(self.f1.f1), self.f1.f2)).nnf()
-            if(isinstance(self.f1, BiImpl)):
-                return Not(Or(And(self.f1.f1, self.f1.f2), And(Not(self.f1.f1), Not(self.f1.f2)))).nnf()
-            return self
-        if(isinstance(self, And)):
-            return And(self.f1.nnf(), self.f2.nnf())
-        if(isinstance(self, Or)):
-            return Or(self.f1.nnf(), self.f2.nnf())
-        if(isinstance(self, Impl)):
-            return Or(Not(self.f1), self.f2).nnf()
-        if(isinstance(self, BiImpl)):
-            return Or(And(self.f1, self.f2), And(Not(self.f1), Not(self.f2))).nnf()
+    def __ne__(self, other):
+        return self is not other
+
+    def __hash__(self):
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Formulae are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Formulae are immutable")
+
+    def __copy__(self):
         return self
 
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        if isinstance(self, (Atom, Bool)):
+            return (self.__class__, (self.f1,))
+        return (_from_bytes, (serialize([self]),))
+
+    def simplify(self):
+        """
+        An equivalent, often smaller formula. Conjunctions and disjunctions
+        are flattened, the constants True and False are folded, duplicate,
+        complementary and absorbed operands are removed, and implications
+        and equivalences with constant or equal sides are decided. The
+        operands keep the order of their first occurrence and are rebuilt
+        with makeConjunction and makeDisjunction. Atoms, including CAL
+        atoms like Causes('a', 'b'), are left as they are.
+
+        The result is cached on the (immutable) formula.
+        """
+        try:
+            return self._simplified
+        except AttributeError:
+            pass
+        stack = [self]
+        while stack:
+            f = stack[-1]
+            if "_simplified" in f.__dict__:
+                stack.pop()
+                continue
+            if isinstance(f, (And, Or)):
+                children = _operands(f)
+            elif isinstance(f, Not):
+                children = [f.f1]
+            elif isinstance(f, (Impl, BiImpl)):
+                children = [f.f1, f.f2]
+            else:
+                children = []
+            children = [c for c in children if isinstance(c, Formula)]
+            pending = [c for c in children if "_simplified" not in c.__dict__]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            s = lambda g: g._simplified if isinstance(g, Formula) else g
+            if isinstance(f, (And, Or)):
+                r = _simplify_junction(f, [s(g) for g in _operands(f)])
+            elif isinstance(f, Not):
+                a = s(f.f1)
+                c = _constant(a)
+                r = Bool(not c) if c is not None else _negation(a)
+            elif isinstance(f, (Impl, BiImpl)):
+                a, b = s(f.f1), s(f.f2)
+                ca, cb = _constant(a), _constant(b)
+                if a is b:
+                    r = Bool(True)
+                elif isinstance(f, Impl):
+                    if ca is False or cb is True:
+                        r = Bool(True)
+                    elif ca is True:
+                        r = b
+                    elif cb is False:
+                        r = _negation(a)
+                    else:
+                        r = Impl(a, b)
+                else:
+                    if ca is not None:
+                        r = b if ca else _negation(b)
+                    elif cb is not None:
+                        r = a if cb else _negation(a)
+                    elif _negation(a) is b:
+                        r = Bool(False)
+                    else:
+                        r = BiImpl(a, b)
+            else:
+                c = _constant(f)
+                r = Bool(c) if c is not None else f
+            object.__setattr__(f, "_simplified", r)
+        return self._simplified
+
+    def nnf(self):
+        """ The negation normal form, computed without recursion and cached on the formula. """
+        try:
+            return self._nnf
+        except AttributeError:
+            pass
+        steps = dict()
+
+        def step(pair):
+            k = (id(pair[0]), pair[1])
+            if k not in steps:
+                steps[k] = _nnf_step(*pair)
+            return steps[k]
+
+        # Pairs (subformula, negated), the subformulae are kept alive by self
+        result = _postorder((self, False), lambda pair: step(pair)[0], lambda pair, r: step(pair)[1](r),
+                            key = lambda pair: (id(pair[0]), pair[1]))
+        object.__setattr__(self, "_nnf", result)
+        return result
+
     def isCALLiteral(self):
         if isinstance(self, And) or isinstance(self, Or): # assumes NNF
             return False
@@ -47,13 +390,17 @@ class Formula(object):
         return True
 
     def getAllCALLiterals(self):
-        if self.isCALLiteral():
-            return [self]
-        if isinstance(self, Bool):
-            return []
-        if isinstance(self, Not):
-            return self.f1.getAllCALLiterals()
-        return self.f1.getAllCALLiterals() + self.f2.getAllCALLiterals()
+        literals = []
+        stack = [self]
+        while stack:
+            f = stack.pop()
+            if f.isCALLiteral():
+                literals.append(f)
+            elif isinstance(f, Not):
+                stack.append(f.f1)
+            elif not isinstance(f, Bool):
+                stack.extend([f.f2, f.f1])
+        return literals
         
     @staticmethod
     def make_cnf(f):
@@ -72,23 +419,29 @@ class Formula(object):
         return None
         
     def cnf_it(self):
-        if isinstance(self, Atom):
-            return self
-        # (b v c) & a
-        if(isinstance(self, Or) and isinstance(self.f1, And)):
-            return And(Or(self.f1.f1, self.f2).cnf_it(), Or(self.f1.f2, self.f2).cnf_it())
-        # a & (b v c)
-        if(isinstance(self, Or) and isinstance(self.f2, And)):
-            return And(Or(self.f1, self.f2.f1).cnf_it(), Or(self.f1, self.f2.f2).cnf_it())
-        if(isinstance(self, And)):
-            return And(self.f1.cnf_it(), self.f2.cnf_it())
-        if(isinstance(self, Or)):
-            return Or(self.f1.cnf_it(), self.f2.cnf_it())
-        return self
+        """ One round of distributing Or over And, (b & c) v a becomes (b v a) & (c v a). """
+        # Steps hold the subformulae they create, so ids stay unique while they are in use
+        steps = dict()
 
-    def writeDimacs(self):
-        dlist, dmap = self.dimacs()
-        d = "p cnf "+str(len(dmap))+" "+str(len(dlist))
+        def step(f):
+            if id(f) not in steps:
+                steps[id(f)] = _cnf_step(f)
+            return steps[id(f)]
+
+        def combine(f, r):
+            op = step(f)[1]
+            return f if op is None else op(r[0], r[1])
+
+        return _postorder(self, lambda f: step(f)[0], combine)
+
+    def writeDimacs(self, tseitin = False):
+        if tseitin:
+            dlist, dmap = self.tseitin()
+            nvars = max((abs(l) for c in dlist for l in c), default = 0)
+        else:
+            dlist, dmap = self.dimacs()
+            nvars = len(dmap)
+        d = "p cnf "+str(nvars)+" "+str(len(dlist))
         for c in dlist:
             d += "\n"
             if(type(c) is list):
@@ -100,78 +453,134 @@ class Formula(object):
         return d, dlist, dmap                 
 
     def dimacs(self):
+        """
+        The clauses of a formula in CNF as lists of integers, and the map
+        of the atoms to their variables. The constants are not variables:
+        clauses with a true literal are left out, false literals are
+        dropped, so a false clause is the empty list.
+        """
         clauses = self.asClauseList()
         dimacs_map = dict()
-        counter = 0
         dimacs_list = []
         for c in clauses:
-            if type(c) is list:
-                clause = []
-                for cc in c:
-                    if str(cc) in dimacs_map:
-                        clause.append(dimacs_map[str(cc)])
-                    elif str(cc.getNegation()) in dimacs_map:
-                        clause.append(-1*dimacs_map[str(cc.getNegation())])
-                    else:
-                        counter = counter + 1
-                        if isinstance(cc, Not):
-                            dimacs_map[str(cc.f1)] = counter
-                            clause.append(-1*dimacs_map[str(cc.f1)])
-                        else:
-                            dimacs_map[str(cc)] = counter
-                            clause.append(dimacs_map[str(cc)])
+            if type(c) is not list:
+                c = [c]
+            clause = []
+            satisfied = False
+            for cc in c:
+                atom = cc.f1 if isinstance(cc, Not) else cc
+                value = _constant(atom)
+                if value is not None:
+                    satisfied = satisfied or value != isinstance(cc, Not)
+                    continue
+                if atom not in dimacs_map:
+                    dimacs_map[atom] = len(dimacs_map) + 1
+                clause.append(-dimacs_map[atom] if isinstance(cc, Not) else dimacs_map[atom])
+            if not satisfied:
                 dimacs_list.append(clause)
-            else:
-                clause = []
-                if str(c) in dimacs_map:
-                    dimacs_list.append([dimacs_map[c]])
-                elif str(c.getNegation()) in dimacs_map:
-                    dimacs_list.append([-1*dimacs_map[str(c.getNegation())]])
+        return dimacs_list, dimacs_map
+
+    def tseitin(self):
+        """
+        Equisatisfiable CNF of linear size, in the format of dimacs().
+
+        Instead of distributing Or over And, every compound subformula
+        gets an auxiliary variable defined by a few clauses. Shared
+        subformulae are defined only once, and top-level conjuncts that
+        are already clauses are kept as they are. The map lists the atoms
+        only, auxiliary variables are numbered among them. Constants in
+        such clauses are handled as in dimacs(), nested ones get an
+        auxiliary variable fixed by a unit clause.
+        """
+        connectives = (Not, And, Or, Impl, BiImpl)
+        dimacs_map = dict()
+        dimacs_list = []
+        lits = dict()
+        nvars = 0
+
+        def encode(root):
+            nonlocal nvars
+            stack = [root]
+            while stack:
+                f = stack[-1]
+                if f in lits:
+                    stack.pop()
+                    continue
+                if not isinstance(f, connectives):
+                    nvars += 1
+                    value = _constant(f)
+                    if value is None:
+                        dimacs_map[f] = nvars
+                    else:
+                        dimacs_list.append([nvars if value else -nvars])
+                    lits[f] = nvars
+                    stack.pop()
+                    continue
+                children = [f.f1] if isinstance(f, Not) else [f.f1, f.f2]
+                pending = [c for c in children if c not in lits]
+                if pending:
+                    stack.extend(reversed(pending))
+                    continue
+                stack.pop()
+                if isinstance(f, Not):
+                    lits[f] = -lits[f.f1]
+                    continue
+                nvars += 1
+                x, a, b = nvars, lits[f.f1], lits[f.f2]
+                if isinstance(f, And):
+                    dimacs_list.extend([[-x, a], [-x, b], [x, -a, -b]])
+                elif isinstance(f, Or):
+                    dimacs_list.extend([[x, -a], [x, -b], [-x, a, b]])
+                elif isinstance(f, Impl):
+                    dimacs_list.extend([[x, a], [x, -b], [-x, -a, b]])
                 else:
-                        counter = counter + 1
-                        if isinstance(c, Not):
-                            dimacs_map[str(c.f1)] = counter
-                            clause.append(-1*dimacs_map[str(c.f1)])
-                        else:
-                            dimacs_map[str(c)] = counter
-                            clause.append(dimacs_map[str(c)])
-                dimacs_list.append(clause)
+                    dimacs_list.extend([[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]])
+                lits[f] = x
+            return lits[root]
+
+        def is_literal(f):
+            return not isinstance(f, connectives) or isinstance(f, Not) and not isinstance(f.f1, connectives)
+
+        conjuncts = [self]
+        while conjuncts:
+            f = conjuncts.pop()
+            if isinstance(f, And):
+                conjuncts.extend([f.f2, f.f1])
+                continue
+            disjuncts = [f]
+            clause = []
+            while disjuncts:
+                d = disjuncts.pop()
+                if isinstance(d, Or):
+                    disjuncts.extend([d.f2, d.f1])
+                elif is_literal(d):
+                    clause.append(d)
+                else:
+                    clause = None
+                    break
+            if clause is None:
+                dimacs_list.append([encode(f)])
+                continue
+            values = [_constant(l.f1 if isinstance(l, Not) else l) for l in clause]
+            encoded = [encode(l) for l, v in zip(clause, values) if v is None]
+            if not any(v is not None and v != isinstance(l, Not) for l, v in zip(clause, values)):
+                dimacs_list.append(encoded)
         return dimacs_list, dimacs_map
 
     def asClauseList(self):
         #f = self.cnf()
-        f = self
-        if(isinstance(f, Or)):
-            return [f.getClause()]
-        elif(isinstance(f, And)):
-            return f.f1.asClauseList() + f.f2.asClauseList()
-        else:
-            return [f.getClause()]
+        return [f.getClause() for f in _chain(self, lambda f: isinstance(f, And))]
             
     def getClause(self):
-        if(isinstance(self, Or)):
-            return self.f1.getClause() + self.f2.getClause()
-        else:
-            return [self]
+        return _chain(self, lambda f: isinstance(f, Or))
 
 
     def asConjList(self):
         #f = self.dnf()
-        f = self
-        if(isinstance(f, And)):
-            #print("new clause")
-            return [f.getConj()]
-        elif(isinstance(f, Or)):
-            return f.f1.asConjList() + f.f2.asConjList()
-        else:
-            #print("new clause")
-            return [f.getConj()]
+        return [f.getConj() for f in _chain(self, lambda f: isinstance(f, Or))]
             
     def getConj(self):
-        if(isinstance(self, And)):
-            return self.f1.getConj() + self.f2.getConj()
-        else:
-            return [self]
+        return _chain(self, lambda f: isinstance(f, And))
 
 
     @staticmethod
@@ -222,107 +631,11 @@ class Formula(object):
                 f = Or(f, e)
         return f
 
-    def __eq__(self, other):
-        return self.f1 == other.f1 and self.f2 == other.f2 if self.__class__ == other.__class__ else False
-
-    def __hash__(self):
-        return hash((self.f1, self.f2))
-
     def __str__(self):
         return repr(self)
 
     def __repr__(self):
-        if isinstance(self.f1, str):
-            f1 = "'"+self.f1+"'"
-        else:
-            f1 = str(self.f1)
-        if isinstance(self.f2, str):
-            f2 = "'"+self.f2+"'"
-        else:
-            f2 = str(self.f2)
-
-        if isinstance(self, Atom):
-            return "Atom("+str(f1)+")"
-        if isinstance(self, Bool):
-            return "Bool("+str(f1)+")"
-        if isinstance(self, Good):
-            return "Good("+str(f1)+")"
-        if isinstance(self, Bad):
-            return "Bad("+str(f1)+")"
-        if isinstance(self, Neutral):
-            return "Neutral("+str(f1)+")"
-        if isinstance(self, Not):
-            return "Not("+str(f1)+")"
-        if isinstance(self, Or):
-            return "Or("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, And):
-            return "And("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Impl):
-            return "Impl("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, BiImpl):
-            return "BiImpl("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Affects):
-            return "Affects("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, AffectsPos):
-            return "AffectsPos("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, AffectsNeg):
-            return "AffectsNeg("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Better):
-            return "Better("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, I):
-            return "I("+str(f1)+")"
-        if isinstance(self, End):
-            return "End("+str(f1)+")"
-        if isinstance(self, Means):
-            return "Means("+str(f1)+")"
-        if isinstance(self, Means2):
-            return "Means2("+str(f1)+")"
-        if isinstance(self, Causes):
-            return "Causes("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, PCauses):
-            return "PCauses("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, SCauses):
-            return "SCauses("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Explains):
-            return "Explains("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Prevents):
-            return "Prevents("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Because):
-            return "Because("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Intervention):
-            return "Intervention("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Exists):
-            return "Exists("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Forall):
-            return "Forall("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Gt):
-            return "Gt("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, GEq):
-            return "GEq("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Eq):
-            return "Eq("+str(f1)+", "+str(f2)+")"
-        if isinstance(self, Must):
-            return "Must("+str(f1)+")"
-        if isinstance(self, May):
-            return "May("+str(f1)+")"
-        if isinstance(self, K):
-            return "K("+str(f1)+")"
-        if isinstance(self, Consequence):
-            return "Consequence("+str(f1)+")"
-        if isinstance(self, Caused):
-            return "Caused("+str(f1)+")"
-        if isinstance(self, Instrumental):
-            return "Instrumental("+str(f1)+")"
-        if isinstance(self, Goal):
-            return "Goal("+str(f1)+")"
-        if isinstance(self, Choice):
-            return "Choice("+str(f1)+")"
-        if isinstance(self, Patient):
-            return "Patient("+str(f1)+")"
-        if isinstance(self, Finally):
-            return "Finally("+str(f1)+")"
-        if isinstance(self, Avoidable):
-            return "Avoidable("+str(f1)+")"
+        return _to_string(self)
 
     def getPosLiteralsEvent(self):
         """ 
@@ -393,242 +706,214 @@ class Formula(object):
         
         
 class OnePlaced(Formula):
-    def __init__(self, f1):
-        super(OnePlaced, self).__init__(f1, None)
+    def __new__(cls, f1):
+        return _intern(cls, f1, None, ("f1", "f2"))
 
 class TwoPlaced(Formula):
-    def __init__(self, f1, f2):
-        super(TwoPlaced, self).__init__(f1, f2)
+    def __new__(cls, f1, f2):
+        return _intern(cls, f1, f2, ("f1", "f2"))
 
 class Atom(str, OnePlaced):
-    def __init__(self, s):
-        super(Atom, self).__init__(s)
+    def __new__(cls, s):
+        key = (cls, s)
+        atom = _interned.get(key)
+        if atom is None:
+            atom = str.__new__(cls, s)
+            object.__setattr__(atom, "f1", s)
+            object.__setattr__(atom, "f2", None)
+            _interned[key] = atom
+        return atom
         
 class Bool(str, OnePlaced):
-    def __init__(self, s):
-        super(Bool, self).__init__(s)
+    def __new__(cls, s):
+        key = (cls, s)
+        b = _interned.get(key)
+        if b is None:
+            b = str.__new__(cls, s)
+            object.__setattr__(b, "f1", s)
+            object.__setattr__(b, "f2", None)
+            _interned[key] = b
+        return b
+
+    def __repr__(self):
+        return str(self)
         
 class Good(OnePlaced):
-    def __init__(self, f1):
-        super(Good, self).__init__(f1)
+    pass
         
 class Bad(OnePlaced):
-    def __init__(self, f1):
-        super(Bad, self).__init__(f1)
+    pass
         
 class Neutral(OnePlaced):
-    def __init__(self, f1):
-        super(Neutral, self).__init__(f1)
+    pass
         
 class Caused(OnePlaced):
-    def __init__(self, f1):
-        super(Caused, self).__init__(f1)
+    pass
         
 class Finally(OnePlaced):
-    def __init__(self, f1):
-        super(Finally, self).__init__(f1)
+    pass
 
 class Avoidable(OnePlaced):
-    def __init__(self, f1):
-        super(Avoidable, self).__init__(f1)
+    pass
 
 
 class Instrumental(OnePlaced):
-    def __init__(self, f1):
-        super(Instrumental, self).__init__(f1)
+    pass
         
 class Not(OnePlaced):
-    def __init__(self, f1):
-        super(Not, self).__init__(f1)
+    pass
 
 
 class And(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(And, self).__init__(f1, f2)
+    pass
 
 class Same(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Same, self).__init__(f1, f2)
+    pass
 
 
 class Or(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Or, self).__init__(f1, f2)
+    pass
 
 
 class Impl(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Impl, self).__init__(f1, f2)
+    pass
         
         
 class BiImpl(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(BiImpl, self).__init__(f1, f2)
+    pass
 
 
 class Affects(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Affects, self).__init__(f1, f2)
+    pass
         
 class Better(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Better, self).__init__(f1, f2)
+    pass
         
 class AffectsPos(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(AffectsPos, self).__init__(f1, f2)
+    pass
         
         
 class AffectsNeg(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(AffectsNeg, self).__init__(f1, f2)
+    pass
         
         
 class I(OnePlaced):
-    def __init__(self, f1):
-        super(I, self).__init__(f1)
+    pass
         
         
 class Goal(OnePlaced):
-    def __init__(self, f1):
-        super(Goal, self).__init__(f1)
+    pass
         
         
 class Choice(OnePlaced):
-    def __init__(self, f1):
-        super(Choice, self).__init__(f1)
+    pass
         
 class Patient(OnePlaced):
-    def __init__(self, f1):
-        super(Patient, self).__init__(f1)
+    pass
         
         
 class End(OnePlaced):
-    def __init__(self, f1):
-        super(End, self).__init__(f1)
+    pass
 
         
 class Means(OnePlaced):
-    def __init__(self, f1):
-        super(Means, self).__init__(f1)
+    pass
         
 class Means2(OnePlaced):
-    def __init__(self, f1):
-        super(Means2, self).__init__(f1)
+    pass
 
 
 class K(OnePlaced):
-    def __init__(self, f1):
-        super(K, self).__init__(f1)
+    pass
         
         
 class Consequence(OnePlaced):
-    def __init__(self, f1):
-        super(Consequence, self).__init__(f1)
+    pass
 
 
 class May(OnePlaced):
-    def __init__(self, f1):
-        super(May, self).__init__(f1)
+    pass
 
 
 class Must(OnePlaced):
-    def __init__(self, f1):
-        super(Must, self).__init__(f1)
+    pass
 
 
 class Causes(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Causes, self).__init__(f1, f2)
+    pass
 
 
 class PCauses(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(PCauses, self).__init__(f1, f2)
+    pass
 
 
 class SCauses(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(SCauses, self).__init__(f1, f2)
+    pass
 
 
 class Explains(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Explains, self).__init__(f1, f2)
+    pass
 
 
 class Prevents(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Prevents, self).__init__(f1, f2)
+    pass
 
 
 class Intervention(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Intervention, self).__init__(f1, f2)
+    pass
         
         
 class Exists(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Exists, self).__init__(f1, f2)
+    pass
         
         
 class Forall(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Forall, self).__init__(f1, f2)
+    pass
 
 
 class Eq(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Eq, self).__init__(f1, f2)
+    pass
 
 
 class Gt(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Gt, self).__init__(f1, f2)
+    pass
 
 
 class GEq(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(GEq, self).__init__(f1, f2)
+    pass
 
 
 class Because(TwoPlaced):
-    def __init__(self, f1, f2):
-        super(Because, self).__init__(f1, f2)
+    pass
 
 class Term(object):
-    def __init__(self, t1, t2):
-        self.t1 = t1
-        self.t2 = t2
-
+    """ Terms are hash-consed and immutable just like formulae. """
     def __eq__(self, other):
-        return self.t1 == other.t1 and self.t2 == other.t2 if self.__class__ == other.__class__ else False
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
 
     def __hash__(self):
-        return hash((self.t1, self.t2))
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Terms are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Terms are immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (_from_bytes, (serialize([self]),))
 
     def __repr__(self):
-        if isinstance(self.t1, str):
-            t1 = "'"+self.t1+"'"
-        else:
-            t1 = str(self.t1)
-        if isinstance(self.t2, str):
-            t2 = "'"+self.t2+"'"
-        else:
-            t2 = str(self.t2)
-
-        if isinstance(self, U):
-            return "U("+str(t1)+")"
-        if isinstance(self, DR):
-            return "DR("+str(t1)+", +"+str(t2)+")"
-        if isinstance(self, DB):
-            return "DB("+str(t1)+", +"+str(t2)+")"
-        if isinstance(self, Minus):
-            return "Minus("+str(t1)+")"
-        if isinstance(self, Sub):
-            return "Sub("+str(t1)+", +"+str(t2)+")"
-        if isinstance(self, Add):
-            return "Add("+str(t1)+", +"+str(t2)+")"
+        return _to_string(self)
 
     def stripParentsFromMechanism(self):
         """ Only for preprocessing the mechanisms. """
@@ -640,41 +925,204 @@ class Term(object):
             return self.t1.stripParentsFromMechanism() + self.t2.stripParentsFromMechanism()
 
 class OnePlacedTerm(Term):
-    def __init__(self, t1):
-        super(OnePlacedTerm, self).__init__(t1, None)
+    def __new__(cls, t1):
+        return _intern(cls, t1, None, ("t1", "t2"))
 
 class TwoPlacedTerm(Term):
-    def __init__(self, t1, t2):
-        super(TwoPlacedTerm, self).__init__(t1, t2)
+    def __new__(cls, t1, t2):
+        return _intern(cls, t1, t2, ("t1", "t2"))
         
 class U(OnePlacedTerm):
-    def __init__(self, t1):
-        super(U, self).__init__(t1)
+    pass
 
         
 class DR(TwoPlacedTerm):
-    def __init__(self, t1, t2):
-        super(DR, self).__init__(t1, t2)
+    pass
         
         
 class DB(TwoPlacedTerm):
-    def __init__(self, t1, t2):
-        super(DB, self).__init__(t1, t2)
+    pass
 
 
 class Minus(OnePlacedTerm):
-    def __init__(self, t1):
-        super(Minus, self).__init__(t1)
+    pass
 
 
 class Sub(TwoPlacedTerm):
-    def __init__(self, t1, t2):
-        super(Sub, self).__init__(t1, t2)
+    pass
 
 
 class Add(TwoPlacedTerm):
-    def __init__(self, t1, t2):
-        super(Add, self).__init__(t1, t2)
+    pass
+
+
+# Serialisation: a header, a table of leaves (atoms, constants and numbers),
+# a table of class names, then three 32 bit integers per node (class,
+# first and second argument) and the references to the roots. A reference
+# i >= 0 is the i-th node, which always precedes the nodes using it, and
+# i < 0 is the leaf -i-1.
+_MAGIC = b"HERA"
+_VERSION = 1
+_CORRUPT = "Not a serialized formula, the data is truncated or corrupt"
+_LEAVES = [Atom, lambda text: Bool(text == "True"), Bool, lambda text: text == "True",
+           int, float, str, lambda text: None]
+
+
+_classes = dict()
+
+
+def _class(name):
+    """ The formula or term class of this module with the given name. """
+    if not _classes:
+        _classes.update((c.__name__, c) for c in globals().values()
+                        if isinstance(c, type) and issubclass(c, (Formula, Term)) and c.__module__ == __name__)
+    if name not in _classes:
+        raise ValueError("Unknown class " + name)
+    return _classes[name]
+
+
+def _leaf_key(x):
+    """ The kind of a leaf (an index into _LEAVES) and its text. """
+    if isinstance(x, Atom):
+        return 0, x.f1
+    if isinstance(x, Bool):
+        return (1, repr(x.f1)) if isinstance(x.f1, bool) else (2, x.f1)
+    if isinstance(x, bool):
+        return 3, repr(x)
+    if isinstance(x, int):
+        return 4, repr(x)
+    if isinstance(x, float):
+        return 5, repr(x)
+    if isinstance(x, str):
+        return 6, x
+    if x is None:
+        return 7, ""
+    raise TypeError("Cannot serialize " + type(x).__name__)
+
+
+def _int_array(values):
+    a = array("i", values)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+def serialize(formulae):
+    """
+    Encodes formulae (and terms) as bytes. Every distinct node is stored
+    once as a few integers referring to its class and arguments, and every
+    atom string once, so shared subformulae cost nothing and deep formulae
+    need no recursion. Models, i.e., sets of literals, are encoded just
+    like lists of formulae. deserialize() turns the bytes back into the
+    (interned) formulae.
+    """
+    leaves, leaf_refs = [], dict()
+    classes, class_refs = [], dict()
+    nodes, node_refs = [], dict()
+
+    def ref(x):
+        if isinstance(x, (Formula, Term)) and not isinstance(x, str):
+            return node_refs[id(x)]
+        key = _leaf_key(x)
+        if key not in leaf_refs:
+            leaf_refs[key] = -len(leaves) - 1
+            leaves.append(key)
+        return leaf_refs[key]
+
+    def args(x):
+        if isinstance(x, Term):
+            return [x.t1, x.t2]
+        return [x.f1, x.f2]
+
+    roots = list(formulae)
+    for root in roots:
+        stack = [root]
+        while stack:
+            x = stack[-1]
+            if not isinstance(x, (Formula, Term)) or isinstance(x, str) or id(x) in node_refs:
+                stack.pop()
+                continue
+            pending = [a for a in args(x) if isinstance(a, (Formula, Term)) and not isinstance(a, str) and id(a) not in node_refs]
+            if pending:
+                stack.extend(reversed(pending))
+                continue
+            stack.pop()
+            if x.__class__ not in class_refs:
+                class_refs[x.__class__] = len(classes)
+                classes.append(x.__class__.__name__)
+            a, b = args(x)
+            nodes.extend([class_refs[x.__class__], ref(a), 0 if b is None else ref(b)])
+            node_refs[id(x)] = len(node_refs)
+    root_refs = [ref(r) for r in roots]
+
+    data = [_MAGIC, struct.pack("<BIIII", _VERSION, len(leaves), len(classes), len(node_refs), len(roots))]
+    for kind, text in leaves:
+        encoded = text.encode("utf-8")
+        data.append(struct.pack("<BI", kind, len(encoded)) + encoded)
+    for name in classes:
+        encoded = name.encode("utf-8")
+        data.append(struct.pack("<H", len(encoded)) + encoded)
+    data.append(_int_array(nodes))
+    data.append(_int_array(root_refs))
+    return b"".join(data)
+
+
+def deserialize(data):
+    """ The list of formulae encoded by serialize(). """
+    if data[:4] != _MAGIC:
+        raise ValueError("Not a serialized formula")
+    try:
+        return _deserialize(data)
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise ValueError(_CORRUPT) from None
+
+
+def _deserialize(data):
+    version, nleaves, nclasses, nnodes, nroots = struct.unpack_from("<BIIII", data, 4)
+    if version != _VERSION:
+        raise ValueError("Unsupported serialization version " + str(version))
+    pos = 4 + struct.calcsize("<BIIII")
+
+    def text(length):
+        nonlocal pos
+        if pos + length > len(data):
+            raise ValueError(_CORRUPT)
+        pos += length
+        return data[pos - length:pos].decode("utf-8")
+
+    leaves = []
+    for _ in range(nleaves):
+        kind, length = struct.unpack_from("<BI", data, pos)
+        pos += 5
+        leaves.append(_LEAVES[kind](text(length)))
+    classes = []
+    for _ in range(nclasses):
+        length, = struct.unpack_from("<H", data, pos)
+        pos += 2
+        classes.append(_class(text(length)))
+    if len(data) - pos != 4 * (3 * nnodes + nroots):
+        raise ValueError(_CORRUPT)
+    ints = array("i")
+    ints.frombytes(data[pos:])
+    if sys.byteorder != "little":
+        ints.byteswap()
+    nodes = []
+
+    def get(i):
+        return nodes[i] if i >= 0 else leaves[-i - 1]
+
+    for i in range(0, 3 * nnodes, 3):
+        c = classes[ints[i]]
+        if issubclass(c, (TwoPlaced, TwoPlacedTerm)):
+            nodes.append(c(get(ints[i + 1]), get(ints[i + 2])))
+        else:
+            nodes.append(c(get(ints[i + 1])))
+    return [get(i) for i in ints[3 * nnodes:]]
+
+
+def _from_bytes(data):
+    return deserialize(data)[0]
+
         
 if __name__ == "__main__":
     import doctest
@@ -0,0 +1,241 @@
+"""
+Minimal hitting sets in pure Python.
+
+A drop-in replacement for the C extensions ethics.extensions.mhsModule
+and ethics.extensions.mhs, used when they are not built. The sets are
+encoded as integer bitsets and the minimal hitting sets are enumerated
+with MMCS (Murakami and Uno, Efficient algorithms for dualizing large-scale
+hypergraphs, 2014), which outputs every minimal hitting set exactly once
+and needs memory linear in the input.
+"""
+
+
+def _popcount(x):
+    return bin(x).count("1")
+
+
+def minimal_hitting_sets(sets, n):
+    """
+    Yields the minimal hitting sets of sets, which are bitsets over the
+    elements 0, ..., n-1, as bitsets.
+
+    Keyword arguments:
+    sets --- A list of integers, bit e of a set is set iff it contains e
+    n --- The number of elements
+    """
+    if any(s == 0 for s in sets):
+        return
+    # occurrences[e] has bit i set iff the i-th set contains e
+    occurrences = [0] * n
+    for i, s in enumerate(sets):
+        e = 0
+        while s:
+            if s & 1:
+                occurrences[e] |= 1 << i
+            s >>= 1
+            e += 1
+    everything = (1 << len(sets)) - 1
+
+    def branch(uncovered, candidates):
+        """ The candidates in the uncovered set with the fewest of them. """
+        best = None
+        i = 0
+        rest = uncovered
+        while rest:
+            if rest & 1:
+                c = sets[i] & candidates
+                if best is None or _popcount(c) < _popcount(best):
+                    best = c
+                    if best == 0:
+                        break
+            rest >>= 1
+            i += 1
+        return [e for e in range(n) if best >> e & 1]
+
+    # Each frame is (solution, critical sets of its elements, uncovered sets, candidates, branch, position)
+    stack = [(0, {}, everything, (1 << n) - 1, None, 0)]
+    while stack:
+        solution, critical, uncovered, candidates, elements, position = stack.pop()
+        if elements is None:
+            if uncovered == 0:
+                yield solution
+                continue
+            elements = branch(uncovered, candidates)
+            for e in elements:
+                candidates &= ~(1 << e)
+        if position == len(elements):
+            continue
+        e = elements[position]
+        # Try the remaining elements of the branch after this one
+        stack.append((solution, critical, uncovered, candidates | 1 << e, elements, position + 1))
+        hit = occurrences[e]
+        updated = {f: c & ~hit for f, c in critical.items()}
+        if all(updated.values()):
+            updated[e] = uncovered & hit
+            stack.append((solution | 1 << e, updated, uncovered & ~hit, candidates, None, 0))
+
+
+def growing_hitting_sets(sets, n, conflicts = None):
+    """
+    Yields the minimal hitting sets of a family of bitsets over the
+    elements 0, ..., n-1 in increasing size, while the family grows.
+
+    The caller may append sets to the list sets whenever the generator
+    is suspended, e.g., a set missed by the hitting set just yielded. A
+    yielded set that still hits every set when the generator resumes is
+    a minimal hitting set of the family, the others are dropped. Each
+    size is searched depth first, adding elements in increasing order
+    only, so no set is visited twice per size, and an element is only
+    added if it hits a set not hit yet and leaves every chosen element a
+    set hit by it alone (as in MMCS). Once all smaller hitting sets are
+    known, a minimal hitting set of the grown family is one of every
+    family in between, so the search continues with the new sets instead
+    of starting over. None is yielded after every inner node, so the
+    caller may stop between any two of them.
+
+    Keyword arguments:
+    sets --- A list of integers, bit e of a set is set iff it contains e
+    n --- The number of elements
+    conflicts --- Optionally, for each element the bitset of the elements
+                  it is never chosen with, which also prunes the hitting
+                  sets of the grown family
+    """
+    # occurrences[e] has bit i set iff the i-th set contains e
+    occurrences = [0] * n
+    known = 0
+
+    def learn():
+        """ Adds the new sets to occurrences, returns False if one is empty. """
+        nonlocal known
+        for i in range(known, len(sets)):
+            s = sets[i]
+            if s == 0:
+                return False
+            while s:
+                low = s & -s
+                occurrences[low.bit_length() - 1] |= 1 << i
+                s ^= low
+        known = len(sets)
+        return True
+
+    def catch_up(chosen, hit, once, since):
+        """ Updates the sets hit (once) by chosen with the sets learnt since a frame was pushed. """
+        for i in range(since, known):
+            c = sets[i] & chosen
+            if c:
+                hit |= 1 << i
+                if c & (c - 1) == 0:
+                    once |= 1 << i
+        return hit, once
+
+    def dead_end(hit, position):
+        """ Whether a set not hit has no element from position on. """
+        unhit = ~hit & (1 << known) - 1
+        while unhit:
+            low = unhit & -unhit
+            if sets[low.bit_length() - 1] >> position == 0:
+                return True
+            unhit ^= low
+        return False
+
+    size = 0
+    while size <= n:
+        if not learn():
+            return
+        cut = False
+        # Each frame is (elements, their bitset, sets hit, sets hit by one element, next element, sets known)
+        stack = [((), 0, 0, 0, 0, known)]
+        while stack:
+            elements, chosen, hit, once, position, since = stack.pop()
+            hit, once = catch_up(chosen, hit, once, since)
+            if hit == (1 << known) - 1:
+                if len(elements) < size:
+                    # Found at a smaller size
+                    continue
+                since = known
+                yield chosen
+                if not learn():
+                    return
+                hit, once = catch_up(chosen, hit, once, since)
+                if hit == (1 << known) - 1:
+                    continue
+                # Sets pruned before the new sets were known may grow
+                # into hitting sets of the next size
+                cut = True
+            # Every set not hit yet needs an element from position on
+            unhit = ~hit & (1 << known) - 1
+            if dead_end(hit, position):
+                continue
+            union = 0
+            common = -1
+            bound = n - 1
+            while unhit:
+                low = unhit & -unhit
+                s = sets[low.bit_length() - 1] >> position << position
+                union |= s
+                common &= s
+                bound = min(bound, s.bit_length() - 1)
+                unhit ^= low
+            if len(elements) == size:
+                cut = True
+                continue
+            # An element must hit a set not hit yet, and all sets not hit
+            # yet need a larger one. At the last size, it must hit all of
+            # them, the others are only checked for larger sizes.
+            last = len(elements) == size - 1
+            pool = union & (1 << bound + 1) - 1
+            children = []
+            while pool:
+                low = pool & -pool
+                e = low.bit_length() - 1
+                pool ^= low
+                if last and not common & low and cut or conflicts is not None and conflicts[e] & chosen:
+                    continue
+                occ = occurrences[e]
+                updated = once & ~occ | occ & ~hit
+                if not all(occurrences[x] & updated for x in elements):
+                    continue
+                if last and not common & low:
+                    cut = not dead_end(hit | occ, e + 1)
+                    continue
+                children.append((elements + (e,), chosen | low, hit | occ, updated, e + 1, known))
+            stack.extend(reversed(children))
+            yield None
+        if not cut:
+            return
+        size += 1
+
+
+def hitting_sets(sets):
+    """
+    The minimal hitting sets of sets of strings (or other hashable
+    elements), like ethics.extensions.mhsModule.hitting_sets.
+
+    >>> hitting_sets([["a", "b"], ["b", "c"]])
+    [['a', 'c'], ['b']]
+    """
+    elements = []
+    index = dict()
+    bitsets = []
+    for s in sets:
+        bits = 0
+        for x in s:
+            if x not in index:
+                index[x] = len(elements)
+                elements.append(x)
+            bits |= 1 << index[x]
+        bitsets.append(bits)
+    result = []
+    for h in minimal_hitting_sets(bitsets, len(elements)):
+        result.append([x for i, x in enumerate(elements) if h >> i & 1])
+    return result
+
+
+def mhs(family):
+    """
+    The minimal hitting sets of a family of lists of non-negative integers,
+    like ethics.extensions.mhs.mhs.
+    """
+    bitsets = [sum(1 << x for x in set(s)) for s in family]
+    n = max((b.bit_length() for b in bitsets), default = 0)
+    return [[x for x in range(n) if h >> x & 1] for h in minimal_hitting_sets(bitsets, n)]
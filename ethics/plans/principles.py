@@ -10,6 +10,8 @@ class Principle:
         self.model = model
         self.label = self.__class__.__name__
         self.is_permissible = None
+        # Suspended search of explain with a budget
+        self.anytime = None
     
     def buildConjunction(self):
         return Formula.makeConjunction(self.formulae)
@@ -17,11 +19,26 @@ class Principle:
     def permissible(self):
         pass
 
-    def explain(self, *args):
-        reasons = generate_reasons(self.model, self, args)
+    def explain(self, *args, k = None, budget = None):
+        """ Sufficient, necessary and INUS reasons, only the k shortest of each kind unless k is None.
+
+        With a budget (seconds or a Budget), the reasons are searched like
+        with k, shortest first, and the search stops when the budget is
+        exhausted. The result then has "complete" set to False, and calling
+        explain with a budget and the same k again continues the search.
+        """
+        if budget is not None:
+            if self.anytime is None or self.anytime.k != k:
+                self.anytime = anytime_reasons(self.model, self, k = k)
+            reasons = self.anytime.run(budget if isinstance(budget, Budget) else Budget(seconds = budget))
+        else:
+            reasons = generate_reasons(self.model, self, args, k = k)
         suff = {r["reason"] for r in reasons if r["type"] == "sufficient"}
         nec = {r["reason"] for r in reasons if r["type"] == "necessary"}
         inus = generate_inus_reasons(reasons)
+        if budget is not None:
+            return {"permissible": self.anytime.perm, "principle": self.label, "sufficient": suff, "necessary": nec, "inus": inus,
+                    "complete": self.anytime.complete}
         if len(reasons) > 0:
             return {"permissible": reasons[0]["perm"], "principle": self.label, "sufficient": suff, "necessary": nec, "inus": inus}
         return []    
@@ -295,11 +295,15 @@ class Situation:
             p = principle
         return p.permissible()
 
-    def explain(self, principle, *args):
+    def explain(self, principle, *args, k = None, budget = None):
         """Explain why the ethical principle permits the situation.
         
-        :param principle: Ethical principle
+        :param principle: Ethical principle, or a principle instance to continue its explanation
         :type principle: Principle
+        :param k: Only compute the k shortest sufficient and necessary reasons, all if None
+        :type k: int
+        :param budget: Stop after this many seconds (or Budget) and return the reasons found so far
+        :type budget: float
         :return: An explanation consisting of sufficient, necessary, and inus reasons
         :rtype: dict
         """
@@ -307,7 +311,7 @@ class Situation:
             p = principle(self, args)
         except:
             p = principle
-        return p.explain()
+        return p.explain(k = k, budget = budget)
             
     def is_applicable(self, action, state):
         """Check if an action is applicable in a given state.
@@ -1,18 +1,616 @@
-import time
 from ethics.language import *
 from ethics.tools import *
-from enum import Enum
-import pyeda.inter
+from ethics.solver import satisfiable, smt_all_models, theory_atoms, theory_clauses, count_models, CDCLSession, \
+    truthtable
+from ethics.allsat import BDD, FALSE, TRUE, occurrence_order
+from ethics.allsat import iter_cubes as iter_formula_cubes
+from ethics.mhs import growing_hitting_sets
 from functools import reduce
-from ethics.extensions.mhsModule import hitting_sets as mhs_old
-from ethics.extensions.mhs import mhs as mhs_new
-from ethics.extensions.sat import sat as sat
+try:
+    from ethics.extensions.mhsModule import hitting_sets as mhs_old
+except ImportError:
+    from ethics.mhs import hitting_sets as mhs_old
+
+
+def hitting_sets_gde(sets):
+    sets = sorted(sets, key=len)
+    formulae = dict()
+    sets_new = []
+    for s in sets:
+        new_set = []
+        for f in s:
+            formulae[str(f)] = f
+            new_set.append(str(f))
+        sets_new.append(new_set)
+    mhs = mhs_old(sets_new)
+    result = []
+    for m in mhs:
+        r = []
+        for f in m:
+            r.append(formulae[f])
+        result.append(r)
+    return result
+
+
+
+def complement(l):
+    return l.f1 if isinstance(l, Not) else Not(l)
+
+def is_literal(l):
+    connectives = (Not, And, Or, Impl, BiImpl, Bool)
+    return not isinstance(l, connectives) or isinstance(l, Not) and not isinstance(l.f1, connectives)
+
+def consistent_terms(terms):
+    """
+    For each term (list of literals), whether its conjunction is
+    satisfiable modulo the Simple CAL axioms, as satisfiable() decides it.
+
+    A set of literals assigns all of its atoms, and the axioms of a set of
+    atoms are exactly the axioms of a superset that only mention these
+    atoms. So a term is consistent iff it contains no complementary
+    literals and falsifies none of the axioms of all atoms of the batch,
+    which are computed once. No solver is called, except for terms with
+    non-literal elements.
+    """
+    atoms = set()
+    for t in terms:
+        if all(is_literal(l) for l in t):
+            atoms.update(l.f1 if isinstance(l, Not) else l for l in t)
+    # An axiom is falsified only if the term contains the complement of its first literal
+    watches = dict()
+    for clause in theory_clauses(atoms):
+        watches.setdefault(complement(clause[0]), []).append(clause)
+    result = []
+    for t in terms:
+        if not all(is_literal(l) for l in t):
+            result.append(satisfiable(Formula.makeConjunction(t)))
+            continue
+        lits = set(t)
+        result.append(not any(complement(l) in lits for l in lits) and
+                      not any(all(complement(c) in lits for c in clause) for l in lits for clause in watches.get(l, ())))
+    return result
+
+def remove_trivial_clauses(clauses):
+    """ The clauses that are not valid modulo the Simple CAL axioms. """
+    consistent = consistent_terms([[complement(l) for l in c] for c in clauses])
+    return [c for c, keep in zip(clauses, consistent) if keep]
+
+def remove_unsatisfiable_terms(terms):
+    """ The terms that are satisfiable modulo the Simple CAL axioms. """
+    consistent = consistent_terms(terms)
+    return [t for t, keep in zip(terms, consistent) if keep]
+
+
+def _decode(terms, atoms):
+    """ Turns terms of integer literals (i + 1 for the i-th atom) into lists of formulae. """
+    return [[atoms[l - 1] if l > 0 else Not(atoms[-l - 1]) for l in t] for t in terms]
+
+
+def _negate(terms):
+    return [[complement(l) for l in t] for t in terms]
+
+
+def _dualise_primes(formula, theory):
+    """
+    Dualises the models twice with the minimal hitting sets of
+    hitting_sets_gde. Modulo the axioms, the models are the ones of
+    smt_all_models, and the axioms are only applied to filter the
+    results, so the result may contain literals the axioms make
+    redundant.
+    """
+    if theory:
+        models = smt_all_models(formula)
+        prime_implicates = remove_trivial_clauses(hitting_sets_gde(models))
+        prime_implicants = remove_unsatisfiable_terms(hitting_sets_gde(prime_implicates))
+        return prime_implicants, prime_implicates
+
+    def trivial(t):
+        return any(complement(l) in t for l in t)
+
+    atoms = occurrence_order(formula)
+    models = _decode(iter_formula_cubes(formula, atoms), atoms)
+    prime_implicates = [c for c in hitting_sets_gde(models) if not trivial(c)]
+    prime_implicants = [t for t in hitting_sets_gde(prime_implicates) if not trivial(t)]
+    return prime_implicants, prime_implicates
+
+
+# The leaves of a ZDD: the empty family and the family of the empty set
+EMPTY = 0
+BASE = 1
+
+
+class PrimeCover():
+    """
+    The prime implicants of the nodes of a BDD, as the nodes of a
+    zero-suppressed decision diagram (ZDD) of sets of literals.
+
+    Following Coudert and Madre (Implicit and incremental computation of
+    primes and essential primes of Boolean functions, 1992), the primes of
+    a node with variable x and children f0 (x false) and f1 (x true) are
+    the primes of f0 & f1, the primes of f0 that are not primes of f0 & f1
+    extended by ~x, and those of f1 that are not extended by x. The
+    primes of every node are computed once, so memory is bounded by the
+    sizes of the diagrams, not by the number of models or primes.
+
+    A ZDD node tests an element, its hi child are the sets with the
+    element (without it), its lo child the sets without it. Literal v of
+    the BDD is element 2v + 1, literal -v element 2v, so the literals of a
+    variable precede the ones of the variables below it.
+    """
+    def __init__(self, bdd):
+        self.bdd = bdd
+        self.element = [float("inf"), float("inf")]
+        self.lo = [None, None]
+        self.hi = [None, None]
+        self.unique = dict()
+        self.memo = dict()
+
+    def node(self, e, lo, hi):
+        if hi == EMPTY:
+            return lo
+        key = (e, lo, hi)
+        z = self.unique.get(key)
+        if z is None:
+            z = len(self.element)
+            self.element.append(e)
+            self.lo.append(lo)
+            self.hi.append(hi)
+            self.unique[key] = z
+        return z
+
+    def __known_difference(self, z, w):
+        """ The difference of z and w if it is trivial or memoised, else None. """
+        if z == EMPTY or z == w:
+            return EMPTY
+        if w == EMPTY:
+            return z
+        return self.memo.get(("diff", z, w))
+
+    def difference(self, z, w):
+        """ The sets of family z that are not in family w. """
+        r = self.__known_difference(z, w)
+        if r is not None:
+            return r
+        # The differences of the children before their parents, with an explicit stack
+        stack = [(z, w)]
+        while stack:
+            a, b = stack[-1]
+            if self.__known_difference(a, b) is not None:
+                stack.pop()
+                continue
+            ea, eb = self.element[a], self.element[b]
+            if ea < eb:
+                pairs = [(self.lo[a], b)]
+            elif ea > eb:
+                pairs = [(a, self.lo[b])]
+            else:
+                pairs = [(self.lo[a], self.lo[b]), (self.hi[a], self.hi[b])]
+            results = [self.__known_difference(*pair) for pair in pairs]
+            if None in results:
+                stack.extend(pair for pair, r in zip(pairs, results) if r is None)
+                continue
+            stack.pop()
+            if ea < eb:
+                r = self.node(ea, results[0], self.hi[a])
+            elif ea > eb:
+                r = results[0]
+            else:
+                r = self.node(ea, results[0], results[1])
+            self.memo[("diff", a, b)] = r
+        return self.memo[("diff", z, w)]
+
+    def __known_primes(self, u):
+        if u <= TRUE:
+            # No primes for FALSE, the empty term for TRUE
+            return EMPTY if u == FALSE else BASE
+        return self.memo.get(u)
+
+    def primes(self, u):
+        """ The ZDD of the prime implicants of the BDD node u. """
+        bdd = self.bdd
+        # The primes of the children and of their conjunction before the
+        # ones of their parent, with an explicit stack
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if self.__known_primes(w) is not None:
+                stack.pop()
+                continue
+            lo, hi = bdd.lo[w], bdd.hi[w]
+            nodes = [bdd.conj(lo, hi), lo, hi]
+            both, negative, positive = [self.__known_primes(v) for v in nodes]
+            if both is None or negative is None or positive is None:
+                stack.extend(v for v in nodes if self.__known_primes(v) is None)
+                continue
+            stack.pop()
+            x = bdd.var[w]
+            negative = self.difference(negative, both)
+            positive = self.difference(positive, both)
+            self.memo[w] = self.node(2 * x, self.node(2 * x + 1, both, positive), negative)
+        return self.__known_primes(u)
+
+    def iter_terms(self, z):
+        """ Yields the sets of ZDD z as lists of integer literals ordered by variable. """
+        path = []
+        # Each frame is (node, length of the path above it, literal leading to it)
+        stack = [(z, 0, None)]
+        while stack:
+            z, depth, literal = stack.pop()
+            del path[depth:]
+            if literal is not None:
+                path.append(literal)
+            if z == BASE:
+                yield list(path)
+            elif z != EMPTY:
+                e = self.element[z]
+                stack.append((self.hi[z], len(path), e >> 1 if e & 1 else -(e >> 1)))
+                if self.lo[z] != EMPTY:
+                    stack.append((self.lo[z], len(path), None))
+
+
+def _compatible(bdd, u, term):
+    """ Whether BDD node u has a model that extends the term of integer literals. """
+    values = {abs(l): l > 0 for l in term}
+    visited = set()
+    stack = [u]
+    while stack:
+        u = stack.pop()
+        if u == TRUE:
+            return True
+        if u == FALSE or u in visited:
+            continue
+        visited.add(u)
+        value = values.get(bdd.var[u])
+        if value is None:
+            stack.extend([bdd.lo[u], bdd.hi[u]])
+        else:
+            stack.append(bdd.hi[u] if value else bdd.lo[u])
+    return False
+
+
+def iter_bdd_primes(formula, implicates = False, theory = True):
+    """
+    Yields the prime implicants (or prime implicates) of a formula as
+    lists of literals, without enumerating its models, see PrimeCover.
+
+    The prime implicants modulo the axioms T are the prime implicants of
+    formula | ~T consistent with T, the prime implicates the negated prime
+    implicants of ~formula | ~T consistent with T.
+
+    Keyword arguments:
+    formula --- A formula built from atoms with Not, And, Or, Impl, BiImpl and Bool
+    implicates --- Whether to yield the prime implicates instead of the implicants
+    theory --- Whether to take the primes modulo the axioms of Simple CAL
+    """
+    atoms = occurrence_order(formula)
+    variables = {a: i + 1 for i, a in enumerate(atoms)}
+    bdd = BDD()
+    f = bdd.compile(formula, variables)
+    if implicates:
+        f = bdd.neg(f)
+    axioms = TRUE
+    if theory:
+        for clause in theory_clauses(set(atoms)):
+            axioms = bdd.conj(axioms, reduce(bdd.disj, [bdd.compile(l, variables) for l in clause], FALSE))
+        f = bdd.disj(f, bdd.neg(axioms))
+    cover = PrimeCover(bdd)
+    for term in cover.iter_terms(cover.primes(f)):
+        if axioms == TRUE or _compatible(bdd, axioms, term):
+            term = _decode([term], atoms)[0]
+            yield _negate([term])[0] if implicates else term
+
+
+def _prime_order(formula):
+    """ A sort key for primes: by size, then by the first occurrence of their atoms. """
+    order = {a: i for i, a in enumerate(occurrence_order(formula))}
+
+    def key(t):
+        return len(t), [order[l.f1 if isinstance(l, Not) else l] for l in t]
+
+    return key
+
+
+def _bdd_primes(formula, theory):
+    """
+    Computes the primes on a BDD whose atoms are ordered by first
+    occurrence, see iter_bdd_primes.
+    """
+    key = _prime_order(formula)
+    return (sorted(iter_bdd_primes(formula, False, theory), key = key),
+            sorted(iter_bdd_primes(formula, True, theory), key = key))
+
+
+def _truthtable_implicants(allowed, consistent, masks, n):
+    """
+    The prime implicants of a truth table, as tuples of integer literals,
+    sorted by size and variable.
+
+    Terms are extended level by level with literals of larger variables,
+    terms without rows in consistent are dropped, and a term is an
+    implicant if all of its rows are allowed. Implicants are not extended,
+    and an implicant is prime if dropping any one literal does not give
+    an implicant.
+    """
+    result = []
+    rows = masks[0]
+    if rows & consistent == 0:
+        return result
+    if rows & ~allowed == 0:
+        return [()]
+    level = [((), rows)]
+    while level:
+        next_level = []
+        for term, rows in level:
+            for v in range(abs(term[-1]) + 1 if term else 1, n + 1):
+                for l in (v, -v):
+                    r = rows & masks[l]
+                    if r & consistent == 0:
+                        continue
+                    t = term + (l,)
+                    if r & ~allowed:
+                        next_level.append((t, r))
+                    elif all(reduce(int.__and__, [masks[k] for k in t if k != t[i]], masks[0]) & ~allowed
+                             for i in range(len(term))):
+                        result.append(t)
+        level = next_level
+    return result
+
+
+def _truthtable_primes(formula, theory):
+    """
+    Searches the terms of the truth table of ethics.truthtable, with the
+    columns stored as integers with one bit per row. Raises ValueError
+    for formulae with more than truthtable.MAX_ATOMS atoms, and
+    ImportError without NumPy.
+    """
+    if truthtable is None:
+        raise ImportError("The truthtable strategy needs NumPy")
+    atoms = occurrence_order(formula)
+    n = len(atoms)
+    table = truthtable.TruthTable(atoms, theory_clauses(set(atoms)) if theory else ())
+    full = (1 << (1 << n)) - 1
+    # masks[v] are the rows where the v-th atom is true, masks[-v] the others, masks[0] all rows
+    masks = {0: full}
+    for i, column in enumerate(table.columns):
+        masks[i + 1] = table.bits(column)
+        masks[-i - 1] = full & ~masks[i + 1]
+    rows = table.bits(table.evaluate(formula))
+    valid = table.bits(table.valid)
+    prime_implicants = _truthtable_implicants(rows | full & ~valid, valid, masks, n)
+    counter_implicants = _truthtable_implicants(full & ~rows | full & ~valid, valid, masks, n)
+    return _decode(prime_implicants, atoms), _negate(_decode(counter_implicants, atoms))
+
+
+def iter_hitting_sets(sets, literals = None):
+    """
+    Yields the minimal hitting sets of sets in increasing size, optionally
+    only those made of the given literals, see growing_hitting_sets.
+    """
+    sets = [set(s) if literals is None else {l for l in s if l in literals} for s in sets]
+    elements = sorted({l for s in sets for l in s}, key = str)
+    index = {l: i for i, l in enumerate(elements)}
+    for h in growing_hitting_sets([sum(1 << index[l] for l in s) for s in sets], len(elements)):
+        if h is not None:
+            yield [l for i, l in enumerate(elements) if h >> i & 1]
+
+
+def literal_order(formula):
+    """ A sort key for literals: the first occurrence of their atom in the
+    formula, an atom before its negation. """
+    index = {a: i for i, a in enumerate(occurrence_order(formula))}
+
+    def key(l):
+        negative = isinstance(l, Not)
+        return index.get(l.f1 if negative else l, len(index)), negative
+
+    return key
+
+
+def iter_prime_implicates(formula, theory = True):
+    """ Yields the prime implicates of a formula modulo the Simple CAL
+    axioms in increasing size, the negated prime implicants of its negation. """
+    return (c for c in prime_implicate_steps(formula, theory) if c is not None)
+
+def prime_implicate_steps(formula, theory = True):
+    """ Like iter_prime_implicates, but also yields None where prime_implicant_steps does. """
+    for t in prime_implicant_steps(Not(formula), theory = theory):
+        yield None if t is None else [complement(l) for l in t]
+
+def iter_prime_implicants(formula, literals = None, theory = True):
+    """
+    Yields the prime implicants of a formula modulo the Simple CAL axioms
+    in increasing size, optionally only those made of the given literals.
+
+    A term implies the formula iff it contradicts every counter model, so
+    the prime implicants are minimal hitting sets of the literals that the
+    counter models falsify. Counter models are only computed on demand,
+    by one solver session: a hitting set of those found so far is either
+    an implicant or yields another counter model, and the search goes on
+    with it (see growing_hitting_sets). Each counter model is shrunk to
+    few falsified literals first, so it prunes many hitting sets. The
+    literals of a term follow literal_order. Without theory, all atoms
+    are independent, as in compile_primes.
+    """
+    return (t for t in prime_implicant_steps(formula, literals, theory) if t is not None)
+
+def prime_implicant_steps(formula, literals = None, theory = True):
+    """ Like iter_prime_implicants, but also yields None after each solver
+    call and each step of the hitting set search, so it can be stopped in
+    between. """
+    atoms = theory_atoms(formula)
+    if literals is None:
+        literals = atoms | {Not(a) for a in atoms}
+    literals = sorted(literals, key = literal_order(formula))
+    index = {l: i for i, l in enumerate(literals)}
+    counter = CDCLSession(Not(formula), theory)
+    models = CDCLSession(formula, theory)
+    if any(complement(l) in index for l in literals):
+        axioms = theory_clauses(atoms) if theory else []
+        conflicts = _conflicts(literals, index, axioms)
+        shrink = _contradicted(models, literals, conflicts, axioms)
+    else:
+        conflicts = None
+        shrink = _maximal_satisfied(counter, literals)
+    everything = (1 << len(literals)) - 1
+    sets = []
+    for h in growing_hitting_sets(sets, len(literals), conflicts):
+        if h is None:
+            yield None
+            continue
+        t = [l for i, l in enumerate(literals) if h >> i & 1]
+        model = counter.get_model(*t)
+        yield None
+        if model is False:
+            if models.satisfiable(*t):
+                yield t
+            else:
+                # Contradicts the axioms, rejected by a set that every
+                # consistent implicant hits
+                sets.append(everything & ~h)
+            continue
+        falsified = yield from shrink(model)
+        sets.append(sum(1 << index[l] for l in falsified))
+
+
+def _conflicts(literals, index, axioms):
+    """ For each literal, the bitset of the literals that contradict it
+    under the axioms, by unit propagation. """
+    watches = dict()
+    for clause in axioms:
+        for l in clause:
+            watches.setdefault(complement(l), []).append(clause)
+    result = []
+    for l in literals:
+        implied = {l}
+        queue = [l]
+        while queue:
+            for clause in watches.get(queue.pop(), ()):
+                open_literals = [x for x in clause if complement(x) not in implied]
+                if len(open_literals) == 1 and open_literals[0] not in implied:
+                    implied.add(open_literals[0])
+                    queue.append(open_literals[0])
+        result.append(sum(1 << index[complement(x)] for x in implied if complement(x) in index))
+    return result
+
+
+def _maximal_satisfied(counter, literals):
+    """
+    For literals without complementary pairs: the literals false in a
+    counter model, after adding to the true ones every literal that still
+    leaves a counter model. Every implicant made of the literals contains
+    one of those left.
+    """
+    def shrink(model):
+        satisfied = [l for l in literals if l in model]
+        for l in literals:
+            if l not in model:
+                m = counter.get_model(*satisfied, l)
+                yield None
+                if m:
+                    model = m
+                    satisfied = [x for x in literals if x in model]
+        return [l for l in literals if l not in model]
+
+    return shrink
+
+
+def _contradicted(models, literals, conflicts, axioms):
+    """
+    For all literals: the literals contradicting a subset of a counter
+    model that has no model of the formula. The subset satisfies the
+    axioms of more than two literals on its own, so an implicant that is
+    consistent with the axioms contradicts the subset by unit propagation
+    over the binary ones, i.e., contains one of these literals.
+    """
+    wide = [clause for clause in axioms if len(clause) > 2]
+
+    def shrink(model):
+        kept = [l for l in literals if l in model]
+        for l in list(kept):
+            rest = [x for x in kept if x is not l]
+            present = set(rest)
+            if all(any(x in present for x in clause) for clause in wide):
+                unsatisfiable = not models.satisfiable(*rest)
+                yield None
+                if unsatisfiable:
+                    kept = rest
+        index = {l: i for i, l in enumerate(literals)}
+        bits = 0
+        for l in kept:
+            bits |= conflicts[index[l]]
+        return [l for i, l in enumerate(literals) if bits >> i & 1]
+
+    return shrink
+
+
+def _stream_primes(formula, theory):
+    """ Collects the primes of iter_prime_implicants and iter_prime_implicates. """
+    key = _prime_order(formula)
+    return (sorted(iter_prime_implicants(formula, theory = theory), key = key),
+            sorted(iter_prime_implicates(formula, theory), key = key))
+
+
+# The strategies of compile_primes, each maps a formula and whether to
+# apply the axioms to (prime implicants, prime implicates)
+strategies = {
+    "dualise": _dualise_primes,
+    "bdd": _bdd_primes,
+    "truthtable": _truthtable_primes,
+    "stream": _stream_primes,
+}
+
+# The strategies whose primes do not depend on the names of the atoms
+exact_strategies = ("bdd", "truthtable", "stream")
+
+
+# Largest number of atoms for which compile_primes searches the truth table by default
+TRUTHTABLE_PRIMES_MAX_ATOMS = 5
+
+
+def select_strategy(formula):
+    """ The strategy compile_primes uses by default. Both are exact: the
+    truth table for formulae of up to TRUTHTABLE_PRIMES_MAX_ATOMS atoms,
+    where it is about twice as fast, and the BDD otherwise, as the truth
+    table searches up to 3^n terms. """
+    if truthtable is not None and len(occurrence_order(formula)) <= TRUTHTABLE_PRIMES_MAX_ATOMS:
+        return "truthtable"
+    return "bdd"
+
+
+def compile_primes(formula, strategy = None, theory = True):
+    """
+    The prime implicants and prime implicates of a formula, as lists of
+    lists of literals.
+
+    With theory, primes are taken modulo the axioms of Simple Causal
+    Agency Logic: an implicant is a term consistent with the axioms that
+    entails the formula together with them, an implicate a clause that is
+    not valid under the axioms and is entailed by the formula together
+    with them. Without theory, all atoms, CAL atoms included, are
+    independent propositional variables.
+
+    Keyword arguments:
+    formula --- A formula built from atoms with Not, And, Or, Impl, BiImpl and Bool
+    strategy --- "dualise" (dualising the solver's models twice with minimal
+                 hitting sets, as the explanations always did), "bdd" (the primes
+                 of a BDD, without enumerating models, see PrimeCover), "truthtable" (searching the terms of a truth
+                 table, for small formulae) or "stream" (the primes of iter_prime_implicants and
+                 iter_prime_implicates in increasing size), by default select_strategy(formula)
+    theory --- Whether to take the primes modulo the axioms
+    """
+    # Principles may build formulae with the Python constants True and False
+    formula = sub_to_atoms(formula)
+    if strategy is None:
+        strategy = select_strategy(formula)
+    if strategy not in strategies:
+        raise ValueError("Unknown prime compilation strategy " + str(strategy))
+    return strategies[strategy](formula, theory)
 
 
 class PrimeCompilator:
     """A simple class compiles prime implicants and prime implicates."""
 
-    def __init__(self, formula):
+    def __init__(self, formula, strategy=None):
         """Initialize the compilator class.
 
         Parameters
@@ -24,6 +622,9 @@ class PrimeCompilator:
 
             Avoid using atoms with a name like "Cx", where x is a number.
             Those are reserved for non-boolean mappings.
+        strategy : str, optional
+            The strategy of `compile_primes`, chosen by `select_strategy`
+            if None. Default: None
 
         """
         if not isinstance(formula, Formula):
@@ -31,6 +632,7 @@ class PrimeCompilator:
             exit(0)
 
         self.formula = formula
+        self.strategy = strategy
 
         self.non_boolean_mapping = dict()
         self.non_boolean_back_mapping = dict()
@@ -41,23 +643,22 @@ class PrimeCompilator:
         # Turn the formula into one only consisting of AND, OR, NOT, ATOM
         # and replace non-boolean functions with atoms
         self.__prepare_formula()
+        self.formula = self.formula.simplify()
 
-        # Find the atoms of the formula (sorted for use in BinPy library later)
+        # Find the atoms of the formula
         self.atoms = sorted(self.__find_atoms(), reverse=True)
 
-        # If the negation of the formula has fewer models,
-        # use the negation instead and negate the resulting prime implicants
-        # and implicates
+        # If the negation of the formula has fewer models, compile the
+        # negation instead and negate the resulting prime implicants and
+        # implicates. The models are counted on a BDD, not enumerated.
+        # Valid formulae are compiled as they are.
         self.using_negation = False
-        self.found_models = None
 
-        # possible_assignments = 2**(len(self.atoms))
-        # self.found_models = self.__all_models(self.formula)
-        # num_models = self.__number_of_complete_models(self.found_models)
-        # if num_models > (possible_assignments / 2):
-        #    self.found_models = None
-#
-        #    self.using_negation = True
+        if not isinstance(self.formula, Bool):
+            possible_assignments = 2**(len(self.atoms))
+            num_models = count_models(self.formula)
+            if possible_assignments / 2 < num_models < possible_assignments:
+                self.using_negation = True
 
         # Lists to store the found prime implicants and implicates
         self.prime_implicants = []
@@ -88,8 +689,7 @@ class PrimeCompilator:
             return sub_formula
 
         if isinstance(sub_formula, Not):
-            sub_formula.f1 = self.__prepare_formula(sub_formula.f1)
-            return sub_formula
+            return Not(self.__prepare_formula(sub_formula.f1))
 
         # Replace Impl
         if isinstance(sub_formula, Impl):
@@ -103,9 +703,8 @@ class PrimeCompilator:
             )
 
         if (isinstance(sub_formula, (And, Or))):
-            sub_formula.f1 = self.__prepare_formula(sub_formula.f1)
-            sub_formula.f2 = self.__prepare_formula(sub_formula.f2)
-            return sub_formula
+            return type(sub_formula)(self.__prepare_formula(sub_formula.f1),
+                                     self.__prepare_formula(sub_formula.f2))
 
         # Otherwise it's non-boolean.
         sub_formula_name = str(sub_formula)
@@ -125,35 +724,48 @@ class PrimeCompilator:
     def compile(self):
         """Compile all prime implicants and prime implicates.
 
+        The replacement atoms are independent variables, so the primes are
+        compiled without the axioms of Simple CAL.
+
         Returns
         -------
         (prime implicants, prime implicates)
 
         """
-        self.prime_implicants, self.prime_implicates = self.__compile()
-        map_back = self.non_boolean_back_mapping
-
-        cants = []
-        for p in self.prime_implicants:
-            cant = []
-            for s in p:
-                if s[1] == 0:
-                    cant.append(Not(self.atom_formula_mapping[s[0]]))
-                else:
-                    cant.append(self.atom_formula_mapping[s[0]])
-            cants.append(cant)
-
-        cates = []
-        for p in self.prime_implicates:
-            cate = []
-            for s in p:
-                if s[1] == 0:
-                    cate.append(Not(self.atom_formula_mapping[s[0]]))
-                else:
-                    cate.append(self.atom_formula_mapping[s[0]])
-            cates.append(cate)
-
-        return cants, cates
+        # The formula simplified to a constant
+        if isinstance(self.formula, Bool):
+            self.prime_implicants = [[]] if self.formula.f1 else []
+            self.prime_implicates = []
+            return self.prime_implicants, self.prime_implicates
+
+        if self.using_negation:
+            negated_implicants, negated_implicates = compile_primes(
+                Not(self.formula), self.strategy, theory=False)
+            self.prime_implicants = _negate(negated_implicates)
+            self.prime_implicates = _negate(negated_implicants)
+        else:
+            self.prime_implicants, self.prime_implicates = compile_primes(
+                self.formula, self.strategy, theory=False)
+
+        return ([self.__map_back(p) for p in self.prime_implicants],
+                [self.__map_back(p) for p in self.prime_implicates])
+
+    def __map_back(self, literals):
+        """Replace the atoms of non-boolean functions by the functions.
+
+        Parameters
+        ----------
+        literals: [Formula]
+            A prime implicant or implicate.
+
+        Returns
+        -------
+        [Formula]
+            The literals over the original formula.
+
+        """
+        return [Not(self.atom_formula_mapping[l.f1]) if isinstance(l, Not)
+                else self.atom_formula_mapping[l] for l in literals]
 
     def __find_atoms(self, sub_formula=None):
         """Recursively find all atoms (variables) used in the formula.
@@ -182,195 +794,3 @@ class PrimeCompilator:
 
         return (self.__find_atoms(sub_formula.f1)
                 | (self.__find_atoms(sub_formula.f2)))
-
-    def __number_of_complete_models(self, models):
-        """Calculate the number of complete models from partial models.
-
-        Parameters
-        ----------
-        models : dict()
-            The partial models.
-
-        Returns
-        -------
-        int
-            The number of complete models.
-
-        """
-        atoms = len(self.atoms)
-        return reduce(lambda a, b: a+b, [0]
-                      + [2**(atoms - len(model)) for model in models])
-
-    def _all_models(self, formula):
-        """Find and returns all models of the given formula.
-
-        Parameters
-        ----------
-        formula : Formula
-            The formula whose models you want to find.
-
-        Returns
-        -------
-        [dict(atom_name: truth_value)]
-            A list containing all models of the given formula.
-        """
-        mapping = dict()
-        back_mapping = dict()
-        models = []
-
-        new_models = sat(self.formula, self.atoms)
-        for generated_model in new_models:
-                    # model_dict = dict()
-            model = []
-
-            for atom, truth in generated_model.items():
-                atom = ('+' if truth else '-') + atom
-
-                if atom not in mapping:
-                    int_rep = len(mapping) + 1
-                    mapping[atom] = int_rep
-                    back_mapping[int_rep] = atom
-
-                model.append(mapping[atom])
-                # model_dict[str(atom[1:])] = bit == 1
-
-            # model_list = list(model_dict.items())
-            # models.append(dict(model_list))
-            models.append(model)
-
-        return models, back_mapping
-
-    def __compile(self):
-        prime_implicants = []
-        prime_implicates = []
-
-        models, back_mapping = self._all_models(self.formula)
-
-        # Convert models to lists of tuples
-        # models = [list(model.items()) for model in models]
-        # sets = self.__model_to_target_sets(models)
-        hitting_sets = self.__hitting_sets(models)
-        hitting_sets = self.__remove_trivial_clauses(
-            hitting_sets, back_mapping)
-
-        # Generate prime implicates from the hitting sets (just type casting)
-        for hitting_set in hitting_sets:
-            prime_implicate = self._hitting_set_to_assignment(
-                hitting_set, back_mapping)
-            prime_implicates.append(prime_implicate)
-
-        # Now take the hitting sets and find again all minimal hitting sets
-        # Those then are all prime implicants
-        hitting_sets = self.__hitting_sets(hitting_sets)
-        hitting_sets = self.__remove_trivial_clauses(
-            hitting_sets, back_mapping)
-        # Generate prime implicates from the hitting sets (just type casting)
-        for hitting_set in hitting_sets:
-            prime_implicant = self._hitting_set_to_assignment(
-                hitting_set, back_mapping)
-            prime_implicants.append(prime_implicant)
-
-        # Flip implicants and implicates if necessary
-        if self.using_negation:
-            actual_prime_implicants = [[(name, not truth)
-                                        for name, truth in prime_implicate]
-                                       for prime_implicate in prime_implicates]
-            actual_prime_implicates = [[(name, not truth)
-                                        for name, truth in prime_implicant]
-                                       for prime_implicant in prime_implicants]
-
-            prime_implicates = actual_prime_implicates
-            prime_implicants = actual_prime_implicants
-
-        return prime_implicants, prime_implicates
-
-    def __remove_trivial_clauses(self, sets, back_mapping):
-        """Remove trivial clauses from the sets.
-
-        A clause is trivial if it contains both positive and negative literals
-        of any given atom.
-
-        Parameters
-        ----------
-        sets: [set()]
-            A list containing all the sets.
-
-        Returns
-        -------
-        [set()]
-            The filtered sets.
-
-        """
-        filtered_sets = []
-        for current_set in sets:
-            found_atoms = set()
-            for int_rep in current_set:
-                literal = back_mapping[int_rep]
-                if literal[1:] in found_atoms:
-                    found_atoms = set()
-                    break
-                found_atoms.add(literal[1:])
-
-            if len(found_atoms) > 0:
-                filtered_sets.append(current_set)
-
-        return filtered_sets
-
-    def __model_to_target_sets(self, models):
-        """Create a mhs compatible set of sets using the given model.
-
-        Parameters
-        ----------
-        prime_implicants: [[(atom_name, truth_value)]]
-            The prime implicants.
-        use_sets: bool, optional
-            Creates the sets using python sets if set to True
-            (and lists if set to False). Default: False
-
-        Returns
-        -------
-        [[str]] or [{str}]
-
-        """
-        sets = []
-        for prime_implicant in models:
-            current_set = []
-            for atom, truth_value in prime_implicant:
-                variable = "+" + atom if truth_value else "-" + atom
-                current_set.append(variable)
-            sets.append(current_set)
-        return sets
-
-    def _hitting_set_to_assignment(self, hitting_set, back_mapping):
-        """Convert a hitting set to an assignment.
-
-        Parameters
-        ----------
-        hitting_set: [str]
-            The hitting set.
-
-        Returns
-        -------
-        [(atom_name, truth_value)]
-            The corresponding assignment.
-
-        """
-        assignment = []
-        for int_rep in hitting_set:
-            variable = back_mapping[int_rep]
-            prefix = variable[0]
-            name = variable[1:]
-
-            truth_value = True if prefix == "+" else False
-            assignment.append((name, truth_value))
-
-        return assignment
-
-    def __hitting_sets(self, sets):
-        sorted_sets = []
-        for a_set in sets:
-            sorted_sets.append(sorted(a_set))
-        sorted_sets = sorted(sorted_sets)
-
-        mhs = mhs_new(sorted_sets)
-        return mhs
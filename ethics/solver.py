@@ -1,5 +1,12 @@
 from ethics.language import *
 from ethics.tools import *
+from ethics.cdcl import CDCLSolver
+from ethics.allsat import BDD, FALSE, TRUE, occurrence_order
+from collections import OrderedDict, namedtuple
+try:
+    import ethics.truthtable as truthtable
+except ImportError:
+    truthtable = None
     
 def theory_sat(cand_model):
     """ A Solver for Simple Causal Agency Logic
@@ -105,6 +112,89 @@ def theory_sat(cand_model):
     
     return True
     
+def theory_atoms(formula, atoms = None):
+    """ Collects the atomic formulae (plain atoms and CAL atoms like Causes(a,b)) of a formula. """
+    if atoms is None:
+        atoms = set()
+    stack = [formula]
+    while stack:
+        f = stack.pop()
+        if isinstance(f, Bool) or isinstance(f, bool):
+            continue
+        if isinstance(f, Not):
+            stack.append(f.f1)
+        elif isinstance(f, (And, Or, Impl, BiImpl)):
+            stack.extend([f.f2, f.f1])
+        else:
+            atoms.add(f)
+    return atoms
+
+def theory_clauses(atoms):
+    """ The axioms of Simple Causal Agency Logic restricted to some atoms.
+
+    Each axiom is a clause (a list of literals) and corresponds to one of
+    the checks in theory_sat: a set of literals is rejected by theory_sat
+    iff it falsifies one of the clauses.
+
+    Keyword arguments:
+    atoms --- A set of atomic formulae
+    """
+    def literal_in(l):
+        return l.isCALLiteral() and (l.f1 if isinstance(l, Not) else l) in atoms
+
+    clauses = []
+    for m in atoms:
+        if isinstance(m, Good):
+            if Bad(m.f1) in atoms:
+                clauses.append([Not(m), Not(Bad(m.f1))])
+            if Neutral(m.f1) in atoms:
+                clauses.append([Not(m), Not(Neutral(m.f1))])
+        if isinstance(m, Bad):
+            if Neutral(m.f1) in atoms:
+                clauses.append([Not(m), Not(Neutral(m.f1))])
+        if isinstance(m, Causes):
+            n1 = Not(m.f1).nnf()
+            n2 = Not(m.f2).nnf()
+            if literal_in(m.f1):
+                clauses.append([Not(m), m.f1])
+            if literal_in(m.f2):
+                clauses.append([Not(m), m.f2])
+            if m.f1 != m.f2 and Causes(m.f2, m.f1) in atoms:
+                clauses.append([Not(m), Not(Causes(m.f2, m.f1))])
+            if m.f2 == n1:
+                clauses.append([Not(m)])
+            if Causes(m.f1, n2) in atoms:
+                clauses.append([Not(m), Not(Causes(m.f1, n2))])
+            if Causes(n1, m.f2) in atoms:
+                clauses.append([Not(m), Not(Causes(n1, m.f2))])
+        if isinstance(m, (Caused, Finally, Goal, Instrumental, I)):
+            if type(m)(Not(m.f1).nnf()) in atoms:
+                clauses.append([Not(m), Not(type(m)(Not(m.f1).nnf()))])
+        if isinstance(m, (Eq, GEq)) and m.f1 == m.f2:
+            clauses.append([m])
+        if isinstance(m, Eq):
+            if Gt(m.f1, m.f2) in atoms:
+                clauses.append([Not(m), Not(Gt(m.f1, m.f2))])
+            if Gt(m.f2, m.f1) in atoms:
+                clauses.append([Not(m), Not(Gt(m.f2, m.f1))])
+        if isinstance(m, GEq):
+            if Gt(m.f2, m.f1) in atoms:
+                clauses.append([Not(m), Not(Gt(m.f2, m.f1))])
+        if isinstance(m, Gt):
+            if m.f1 == m.f2:
+                clauses.append([Not(m)])
+            if Gt(m.f2, m.f1) in atoms:
+                clauses.append([Not(m), Not(Gt(m.f2, m.f1))])
+        if isinstance(m, Better):
+            if m.f1 == m.f2:
+                clauses.append([Not(m)])
+            if Better(m.f2, m.f1) in atoms:
+                clauses.append([Not(m), Not(Better(m.f2, m.f1))])
+            for n in atoms:
+                if isinstance(n, Better) and m.f2 == n.f1 and Better(m.f1, n.f2) in atoms:
+                    clauses.append([Not(m), Not(n), Better(m.f1, n.f2)])
+    return clauses
+
 def smt_get_model(formula, model):
     all_models = smt_all_models(formula)
     for m in all_models:
@@ -112,52 +202,460 @@ def smt_get_model(formula, model):
             return m
     return False
 
-def smt_all_models(formula):
-    if(isinstance(formula, list)):
-        formula = Formula.makeConjunction(formula)
-    formula = sub_to_atoms(formula)
-    s = BDDSolver()
-    s.append_formula(formula)
-    models = []
-    for mod in s.enum_models():
-        if theory_sat(mod):
-            models.append(mod)
-    return models
-
-def satisfiable(formula, report_model = False):
-    if(isinstance(formula, list)):
+def smt_iter_models(formula, backend = None):
+    """ Lazily yields the theory-consistent models of a formula one at a time.
+    The theory axioms of the formula's atoms are checked by the backend,
+    hence inconsistent models are never enumerated.
+
+    Keyword arguments:
+    formula --- A formula or a list of formulae (read as conjunction)
+    backend --- Name of the backend to use, by default it is chosen by select_backend
+    """
+    formula = prepare_formula(formula)
+    if isinstance(formula, Bool) and isinstance(formula.f1, bool):
+        if formula.f1:
+            yield set()
+        return
+    yield from get_backend(formula, backend, enumerate = True).iter_models(formula)
+
+def smt_all_models(formula, backend = None):
+    formula = prepare_formula(formula)
+    key = ("models", type(formula), formula, backend or default_backend)
+    models = query_cache.get(key)
+    if models is None:
+        models = list(smt_iter_models(formula, backend))
+        query_cache.put(key, models)
+    return [set(m) for m in models]
+
+def satisfiable(formula, report_model = False, backend = None):
+    formula = prepare_formula(formula)
+    if isinstance(formula, Bool) and isinstance(formula.f1, bool):
+        model = set() if formula.f1 else None
+    else:
+        key = ("model", type(formula), formula, backend or default_backend)
+        model = query_cache.get(key, False)
+        if model is False:
+            model = get_backend(formula, backend).get_model(formula)
+            query_cache.put(key, model)
+    if report_model and model is not None:
+        return set(model)
+    return model is not None
+
+def entails(formula1, formula2, backend = None):
+    return not satisfiable(And(formula1, Not(formula2).nnf()), backend = backend)
+
+
+# Largest number of atoms for which the truth table is used
+TRUTHTABLE_MAX_ATOMS = 12
+
+def count_models(formula, backend = None):
+    """ The number of total assignments to the atoms of a formula that
+    satisfy the formula and the Simple CAL axioms. The models are counted
+    on a truth table or a BDD, they are never enumerated.
+
+    Keyword arguments:
+    formula --- A formula or a list of formulae (read as conjunction)
+    backend --- Name of the backend to use, by default "truthtable" for
+                formulae with up to TRUTHTABLE_MAX_ATOMS atoms and "bdd" otherwise
+    """
+    formula = prepare_formula(formula, simplify = False)
+    if backend is None:
+        backend = default_backend if default_backend in ("bdd", "truthtable") else None
+    if backend is None:
+        small = truthtable is not None and len(truthtable.leaves(formula)) <= TRUTHTABLE_MAX_ATOMS
+        backend = "truthtable" if small else "bdd"
+    return get_backend(formula, backend).count_models(formula)
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+class QueryCache():
+    """ A least recently used cache for the results of solver queries.
+
+    Queries are keyed by the (interned) formula, so repeated queries
+    about the same formula are answered without calling a backend.
+
+    Keyword arguments:
+    maxsize --- The number of results kept, 0 disables the cache
+    """
+    def __init__(self, maxsize = 4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default = None):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last = False)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last = False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+
+# Shared by satisfiable, entails and smt_all_models
+query_cache = QueryCache()
+
+def cache_info():
+    """ Hits, misses, maximal and current size of the query cache. """
+    return query_cache.info()
+
+def cache_clear():
+    """ Empties the query cache and resets its statistics. """
+    query_cache.clear()
+
+def set_cache_size(maxsize):
+    """ Sets the number of query results kept, 0 disables caching. """
+    query_cache.resize(maxsize)
+
+def prepare_formula(formula, simplify = True):
+    """ Turns a query into a formula, which is simplified unless simplify is False. """
+    if isinstance(formula, list):
         formula = Formula.makeConjunction(formula)
-    models = smt_all_models(formula)
-    if report_model and len(models) > 0:
-        return models[0]
-    return len(models) > 0
+    if not isinstance(formula, Formula):
+        formula = sub_to_atoms(formula)
+    if simplify and isinstance(formula, Formula):
+        return formula.simplify()
+    return formula
+
+
+class Backend():
+    """ Interface of the solver backends.
+
+    A model is a set of literals that satisfies the formula and does
+    not violate the Simple CAL axioms of the formula's atoms. Backends
+    differ in the models they report: the BDD backend yields cubes
+    (partial assignments) of its diagram, the others total assignments
+    to the atoms of the formula.
+    """
+    name = None
+
+    def available(self):
+        return True
+
+    def iter_models(self, formula):
+        raise NotImplementedError
+
+    def get_model(self, formula):
+        return next(self.iter_models(formula), None)
+
+    def count_models(self, formula):
+        raise NotImplementedError(self.name + " backend does not count models")
 
-def entails(formula1, formula2):
-    return not satisfiable(And(formula1, Not(formula2).nnf()))
+
+class BDDBackend(Backend):
+    """ Builds the BDD of the formula, models are the paths to the 1-terminal. """
+    name = "bdd"
+
+    def iter_models(self, formula):
+        s = BDDSolver(theory = True)
+        s.append_formula(formula)
+        yield from s.iter_models()
+
+    def count_models(self, formula):
+        """ Counts on the pure Python BDD of ethics.allsat, whose variables
+        follow the first occurrence of the atoms, with the axioms conjoined. """
+        atoms = occurrence_order(formula)
+        variables = {a: i + 1 for i, a in enumerate(atoms)}
+        bdd = BDD()
+        f = bdd.compile(formula, variables)
+        for clause in theory_clauses(set(atoms)):
+            f = bdd.conj(f, bdd.compile(Formula.makeDisjunction(clause), variables))
+        return bdd.count(f, len(atoms))
+
+
+class CDCLBackend(Backend):
+    """ Runs the CDCL solver on the Tseitin clauses of the formula and the theory axioms.
+    Models are enumerated by blocking each one found. """
+    name = "cdcl"
+
+    def iter_models(self, formula):
+        clauses, dimacs_map = formula.tseitin()
+        solver = CDCLSolver(clauses)
+        nvars = max([solver.nvars] + list(dimacs_map.values()))
+        for clause in theory_clauses(theory_atoms(formula)):
+            lits = []
+            for l in clause:
+                atom = l.f1 if isinstance(l, Not) else l
+                if atom not in dimacs_map:
+                    nvars += 1
+                    dimacs_map[atom] = nvars
+                lits.append(-dimacs_map[atom] if isinstance(l, Not) else dimacs_map[atom])
+            solver.add_clause(lits)
+        while True:
+            model = solver.solve()
+            if model is None:
+                return
+            yield {a if model.get(i) else Not(a) for a, i in dimacs_map.items()}
+            solver.add_clause([-i if model.get(i) else i for i in dimacs_map.values()])
+
+
+class TruthTableBackend(Backend):
+    """ Evaluates the formula and the theory axioms on all assignments at once with NumPy. """
+    name = "truthtable"
+
+    def available(self):
+        return truthtable is not None
+
+    def iter_models(self, formula):
+        table = truth_table(formula)
+        for row in table.rows(formula).nonzero()[0]:
+            yield table.model(int(row))
+
+    def count_models(self, formula):
+        return truth_table(formula).count(formula)
+
+
+def truth_table(formula):
+    """ A truth table over the atoms of a formula, whose models respect the theory axioms. """
+    return truthtable.TruthTable(truthtable.leaves(formula), theory_clauses(theory_atoms(formula)))
+
+
+backends = {b.name: b for b in [BDDBackend(), CDCLBackend(), TruthTableBackend()]}
+
+# Name of the backend used for all queries, None for automatic selection
+default_backend = None
+
+def use_backend(name = None):
+    """ Overrides the automatic backend selection for all queries, None restores it. """
+    global default_backend
+    if name is not None and name not in backends:
+        raise ValueError("Unknown solver backend " + repr(name))
+    default_backend = name
+
+def select_backend(formula, enumerate = False):
+    """ Chooses a backend by size and shape of the formula.
+
+    Enumeration always uses the BDD: its cubes cover the models far
+    more compactly than total assignments, and the hitting set
+    computations of the explanations rely on that. For single queries,
+    conjunctions of clauses, e.g., the conjunctions of literals checked
+    when filtering primes, need no auxiliary variables and are solved by
+    unit propagation, so they go to the CDCL solver. Otherwise small
+    formulae go to the truth table, larger ones to the BDD.
+
+    Keyword arguments:
+    formula --- The formula of the query
+    enumerate --- True if all models are requested
+    """
+    if enumerate:
+        return "bdd"
+    if is_clausal(formula):
+        return "cdcl"
+    if truthtable is not None and len(truthtable.leaves(formula)) <= TRUTHTABLE_MAX_ATOMS:
+        return "truthtable"
+    return "bdd"
+
+def is_clausal(formula):
+    """ True iff the formula is a conjunction of disjunctions of literals. """
+    stack = [(formula, False)]
+    while stack:
+        f, in_clause = stack.pop()
+        if isinstance(f, And) and not in_clause:
+            stack.extend([(f.f1, False), (f.f2, False)])
+        elif isinstance(f, Or):
+            stack.extend([(f.f1, True), (f.f2, True)])
+        elif isinstance(f, Not):
+            if isinstance(f.f1, (Not, And, Or, Impl, BiImpl)):
+                return False
+        elif isinstance(f, (And, Impl, BiImpl)):
+            return False
+    return True
+
+def get_backend(formula, name = None, enumerate = False):
+    name = name or default_backend or select_backend(formula, enumerate)
+    if name not in backends:
+        raise ValueError("Unknown solver backend " + repr(name))
+    return backends[name]
 
 
 class BDDSolver():
-    def __init__(self):
+    """ An incremental BDD solver session on the diagrams of ethics.allsat.
+
+    The session keeps one variable table and the BDD of the conjunction
+    of all formulae appended so far. Each formula is compiled in one pass
+    (see BDD.compile) and then conjoined, and atoms get their variables
+    in order of first use. Temporary constraints are either passed as
+    assumptions to the queries or appended between push() and pop().
+
+    With theory = True, the Simple CAL axioms of the atoms are conjoined
+    to the BDD like the formulae, as in BDDBackend.count_models, so every
+    path to the 1-terminal respects them, not only the atoms it assigns.
+
+    Keyword arguments:
+    theory --- If True, models must also satisfy the Simple CAL axioms of the atoms involved
+    """
+    def __init__(self, theory = False):
         self.formulae = []
+        self.axioms = set()
+        self.theory = theory
+        self.atoms = set()
+        self.manager = BDD()
+        self.bdd = TRUE
+        self.stack = []
+        self.variables = dict()
+        self.atom_for_var = dict()
         
     def append_formula(self, f):
         self.formulae.append(f)
+        self.bdd = self.manager.conj(self.bdd, self.__to_bdd(prepare_formula(f)))
+        if self.theory:
+            theory_atoms(f, self.atoms)
+            self.bdd = self.__conjoin_axioms(self.bdd, theory_clauses(self.atoms), self.axioms)
+
+    def append_axiom(self, clause):
+        """ Adds a clause (list of literals) that every model must satisfy. """
+        self.bdd = self.__conjoin_axioms(self.bdd, [clause], self.axioms)
+
+    def push(self):
+        """ Saves the current state of the session. """
+        self.stack.append((self.bdd, len(self.formulae), set(self.axioms), set(self.atoms)))
+
+    def pop(self):
+        """ Restores the state saved by the matching push(). """
+        self.bdd, nformulae, self.axioms, self.atoms = self.stack.pop()
+        del self.formulae[nformulae:]
     
-    def enum_models(self):
-        f = convert_formula_to_pyeda(Formula.makeConjunction(self.formulae))
-        f = pyeda.inter.expr2bdd(f)
-        pyeda_models = list(f.satisfy_all())
-        if pyeda_models:
-            return [convert_pyeda_model_to_hera(pm) for pm in pyeda_models]
-        return []
+    def iter_models(self, *assumptions):
+        """ Yields the models of all formulae and assumptions, converting them lazily. """
+        bdd = self.manager
+        f = self.bdd
+        atoms = self.atoms
+        for a in assumptions:
+            f = bdd.conj(f, self.__to_bdd(prepare_formula(a)))
+            if self.theory:
+                atoms = theory_atoms(a, set(atoms))
+        if self.theory and assumptions:
+            f = self.__conjoin_axioms(f, theory_clauses(atoms), set(self.axioms))
+
+        # Depth first with an explicit stack, each frame is (node, length
+        # of the path above it, assignment leading to it)
+        path = []
+        stack = [(f, 0, None)]
+        while stack:
+            node, depth, assignment = stack.pop()
+            del path[depth:]
+            if assignment is not None:
+                path.append(assignment)
+            if node == TRUE:
+                yield {self.atom_for_var[v] if value == 1 else Not(self.atom_for_var[v]) for v, value in path}
+            elif node != FALSE:
+                stack.append((bdd.hi[node], len(path), (bdd.var[node], 1)))
+                stack.append((bdd.lo[node], len(path), (bdd.var[node], 0)))
+
+    def enum_models(self, *assumptions):
+        return list(self.iter_models(*assumptions))
         
-    def get_model(self):
-        f = convert_formula_to_pyeda(Formula.makeConjunction(self.formulae))
-        f = pyeda.inter.expr2bdd(f)
-        pyeda_model = f.satisfy_one()
-        if pyeda_model:
-            return convert_pyeda_model_to_hera(pyeda_model)
-        return False
+    def get_model(self, *assumptions):
+        return next(self.iter_models(*assumptions), False)
         
-    def satisfiable(self):
-        return self.get_model()
+    def satisfiable(self, *assumptions):
+        return next(self.iter_models(*assumptions), None) is not None
+
+    def entails(self, f):
+        return not self.satisfiable(Not(f))
+
+    def __variable(self, atom):
+        v = self.variables.get(atom)
+        if v is None:
+            v = len(self.variables) + 1
+            self.variables[atom] = v
+            self.atom_for_var[v] = sub_to_atoms(atom)
+        return v
+
+    def __to_bdd(self, formula):
+        """ Compiles a formula, new atoms get the next variables in order of first occurrence. """
+        for atom in occurrence_order(formula):
+            self.__variable(atom)
+        return self.manager.compile(formula, self.variables)
+
+    def __conjoin_axioms(self, f, clauses, conjoined):
+        """ Conjoins the clauses not in the set conjoined to f and adds them to it. """
+        for clause in clauses:
+            key = tuple(clause)
+            if key not in conjoined:
+                conjoined.add(key)
+                for l in clause:
+                    self.__variable(l.f1 if isinstance(l, Not) else l)
+                f = self.manager.conj(f, self.manager.compile(Formula.makeDisjunction(clause), self.variables))
+        return f
+
+
+class CDCLSession():
+    """ An incremental CDCL solver session for the models of one formula.
+
+    The formula and the Simple CAL axioms of its atoms are encoded once,
+    queries only pass literals as assumptions, so the solver keeps the
+    clauses it learnt from one query to the next. This suits many small
+    queries about the same formula, e.g., the counter models searched
+    when enumerating prime implicants.
+
+    Keyword arguments:
+    formula --- The formula
+    theory --- Whether to add the axioms, otherwise all atoms are independent
+    """
+    def __init__(self, formula, theory = True):
+        self.theory = theory
+        atoms = theory_atoms(formula)
+        formula = prepare_formula(formula)
+        if isinstance(formula, Bool):
+            clauses, self.variables = ([] if formula.f1 else [[]]), dict()
+        else:
+            clauses, self.variables = formula.tseitin()
+        self.solver = CDCLSolver(clauses)
+        self.nvars = max([self.solver.nvars] + list(self.variables.values()))
+        self.atoms = set()
+        self.__add_atoms(atoms)
+
+    def get_model(self, *literals):
+        """ A model of the formula and the literals as set of literals over
+        the atoms of both, or False if there is none. """
+        model = self.__solve(literals)
+        if model is None:
+            return False
+        return {a if model.get(v) else Not(a) for a, v in self.variables.items()}
+
+    def satisfiable(self, *literals):
+        return self.__solve(literals) is not None
+
+    def __solve(self, literals):
+        self.__add_atoms({l.f1 if isinstance(l, Not) else l for l in literals} - self.atoms)
+        return self.solver.solve([self.__literal(l) for l in literals])
+
+    def __add_atoms(self, atoms):
+        """ Adds variables for new atoms and the axioms mentioning them. """
+        if not atoms:
+            return
+        self.atoms |= atoms
+        for clause in theory_clauses(self.atoms) if self.theory else ():
+            if any((l.f1 if isinstance(l, Not) else l) in atoms for l in clause):
+                self.solver.add_clause([self.__literal(l) for l in clause])
+        for a in atoms:
+            self.__literal(a)
+
+    def __literal(self, l):
+        atom = l.f1 if isinstance(l, Not) else l
+        v = self.variables.get(atom)
+        if v is None:
+            self.nvars += 1
+            v = self.variables[atom] = self.nvars
+        return -v if isinstance(l, Not) else v
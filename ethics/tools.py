@@ -1,6 +1,11 @@
 from ethics.language import *
+import ethics.language
+from ethics.language import _postorder
 from itertools import combinations, chain
+from functools import lru_cache
 import pyeda.inter
+import ast
+import re
 import time
 
 
@@ -16,86 +21,284 @@ def makeSetOfEpistemicAlternatives(*models):
 
 
 def my_eval(content):
+    """ Parses content like parse_formula, but anything that is not a formula is read as an atom name. """
     try:
-        f = sub_to_atoms(eval(content))
-        return f
-    except:
+        return parse_formula(content)
+    except FormulaSyntaxError:
         return Atom(content)
 
 
-def sub_to_atoms(f):
-    if isinstance(f, str) and not isinstance(f, Atom) and not isinstance(f, bool) and not isinstance(f, Bool):
-        return Atom(f)
-    if isinstance(f, bool) and not isinstance(f, Bool):
+class FormulaSyntaxError(ValueError):
+    """ Raised by parse_formula, reports the offending position of the text. """
+    def __init__(self, message, text, pos):
+        super().__init__(message + " at position " + str(pos) + "\n" + text + "\n" + " " * pos + "^")
+        self.text = text
+        self.pos = pos
+
+
+# All formula and term classes that may be called in the string syntax
+constructors = {name: c for name, c in vars(ethics.language).items()
+                if isinstance(c, type) and issubclass(c, (Formula, Term))
+                and c not in (Formula, OnePlaced, TwoPlaced, Term, OnePlacedTerm, TwoPlacedTerm)}
+
+_token = re.compile(r"""\s*(?:([A-Za-z_]\w*)|('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|([+-]?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)|([(),+]))""")
+
+
+def _tokenize(text):
+    """ Yields (kind, value, position) with kind one of 'name', 'string', 'number', 'punct' and finally 'end'. """
+    pos = 0
+    end = len(text.rstrip())
+    while pos < end:
+        m = _token.match(text, pos)
+        if m is None:
+            while text[pos].isspace():
+                pos += 1
+            raise FormulaSyntaxError("Unexpected character " + repr(text[pos]), text, pos)
+        name, string, number, punct = m.groups()
+        start = m.start(m.lastindex)
+        if name is not None:
+            yield "name", name, start
+        elif string is not None:
+            yield "string", string[1:-1] if "\\" not in string else ast.literal_eval(string), start
+        elif number is not None:
+            yield "number", ast.literal_eval(number.lstrip("+")), start
+        else:
+            yield "punct", punct, start
+        pos = m.end()
+    yield "end", None, end
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(text):
+    """ Parses the string syntax of formulae, e.g., And('a', Not(Causes('a', 'b'))).
+
+    This is the syntax printed by repr(). Quoted strings are atoms, numbers
+    may occur as arguments of terms and comparisons, True and False are
+    read as Bool. Nothing is evaluated. The result is cached, which is safe
+    because formulae are immutable.
+
+    Keyword arguments:
+    text --- The string to parse
+    """
+    tokens = _tokenize(text)
+    token = next(tokens)
+
+    def advance():
+        nonlocal token
+        current = token
+        token = next(tokens, token)
+        return current
+
+    def expect(punct):
+        kind, value, pos = advance()
+        if kind != "punct" or value != punct:
+            raise FormulaSyntaxError("Expected " + repr(punct), text, pos)
+
+    def expression():
+        kind, value, pos = advance()
+        if kind == "string":
+            return Atom(value)
+        if kind == "number":
+            return value
+        if kind == "punct" and value == "+" and token[0] != "end":
+            # repr() writes the second argument of Add, Sub, DR and DB as +t2
+            return expression()
+        if kind == "name":
+            if value in ("True", "False"):
+                return value == "True"
+            if value not in constructors:
+                raise FormulaSyntaxError("Unknown name " + value, text, pos)
+            cls = constructors[value]
+            expect("(")
+            args = []
+            if not (token[0] == "punct" and token[1] == ")"):
+                args.append(expression())
+                while token[0] == "punct" and token[1] == ",":
+                    advance()
+                    args.append(expression())
+            expect(")")
+            if cls is not Bool:
+                args = [Bool(a) if isinstance(a, bool) else a for a in args]
+            try:
+                return cls(*args)
+            except TypeError:
+                raise FormulaSyntaxError("Wrong number of arguments for " + value, text, pos) from None
+        raise FormulaSyntaxError("Unexpected " + ("end of input" if kind == "end" else repr(value)), text, pos)
+
+    f = expression()
+    if token[0] != "end":
+        raise FormulaSyntaxError("Unexpected " + repr(token[1]), text, token[2])
+    if isinstance(f, bool):
         return Bool(f)
-    if isinstance(f, Bool):
-        return f
-    if isinstance(f, OnePlaced):
-        return type(f)(sub_to_atoms(f.f1))
-    if isinstance(f, TwoPlaced):
-        f1 = sub_to_atoms(f.f1)
-        f2 = sub_to_atoms(f.f2)
-        return type(f)(f1,f2)
-    if isinstance(f, OnePlacedTerm):
-        return type(f)(sub_to_atoms(f.t1))
-    if isinstance(f, TwoPlacedTerm):
-        f1 = sub_to_atoms(f.t1)
-        f2 = sub_to_atoms(f.t2)
-        return type(f)(f1,f2)
     return f
 
 
+_compound = (OnePlaced, TwoPlaced, OnePlacedTerm, TwoPlacedTerm)
+
+
+def _arguments(g):
+    """ The arguments of a formula or term, none for atoms and constants. """
+    if isinstance(g, (Atom, Bool)) or not isinstance(g, _compound):
+        return []
+    if isinstance(g, OnePlaced):
+        return [g.f1]
+    if isinstance(g, TwoPlaced):
+        return [g.f1, g.f2]
+    if isinstance(g, OnePlacedTerm):
+        return [g.t1]
+    return [g.t1, g.t2]
+
+
+def sub_to_atoms(f):
+    """ Replaces plain strings and booleans inside a formula by Atoms and Bools. """
+    def combine(g, args):
+        if isinstance(g, (Atom, Bool)):
+            return g
+        if isinstance(g, str):
+            return Atom(g)
+        if isinstance(g, bool):
+            return Bool(g)
+        if isinstance(g, _compound):
+            return type(g)(*args)
+        return g
+
+    return _postorder(f, _arguments, combine)
+
+
+def rename_atoms(f, renaming):
+    """ Replaces every atom a inside a formula (or term) by renaming(a).
+    Atoms are visited from left to right. """
+    def combine(g, args):
+        if isinstance(g, Bool):
+            return g
+        if isinstance(g, str):
+            return renaming(Atom(g))
+        if isinstance(g, _compound):
+            return type(g)(*args)
+        return g
+
+    return _postorder(f, _arguments, combine)
+
+
+def canonical_atoms(f):
+    """ Renames the atoms of a formula to _0, _1, ... in order of first
+    occurrence. Formulae that only differ in the names of their atoms have
+    the same canonical form. Returns the canonical form and the dict from
+    the new atoms back to the original ones.
+
+    >>> canonical_atoms(And(Bad("x"), Or("y", Not("x"))))
+    (And(Bad('_0'), Or('_1', Not('_0'))), {'_0': 'x', '_1': 'y'})
+    """
+    canonical = dict()
+    g = rename_atoms(f, lambda a: canonical.setdefault(a, Atom("_" + str(len(canonical)))))
+    return g, {c: a for a, c in canonical.items()}
+
+
+class SymbolTable():
+    """ A bidirectional table between atoms and the integers 1, 2, ...
+
+    Atoms include compound atoms like Causes('a', 'b'), which the
+    solvers treat as opaque variables. Numbering is by first use. A
+    literal is encoded as the signed index of its atom, as in DIMACS.
+    """
+    def __init__(self):
+        self.indices = dict()
+        self.atoms = [None]
+
+    def index(self, atom):
+        i = self.indices.get(atom)
+        if i is None:
+            i = len(self.atoms)
+            self.indices[atom] = i
+            self.atoms.append(atom)
+        return i
+
+    def atom(self, index):
+        return self.atoms[index]
+
+    def encode(self, literal):
+        if isinstance(literal, Not):
+            return -self.index(literal.f1)
+        return self.index(literal)
+
+    def decode(self, i):
+        if i < 0:
+            return Not(self.atoms[-i])
+        return self.atoms[i]
+
+    def __contains__(self, atom):
+        return atom in self.indices
+
+    def __len__(self):
+        return len(self.atoms) - 1
+
+
 def mapBackToFormulae(l, m): # l: model, m: map
+    atoms = {i: a for a, i in m.items()}
     erg = []
     for ll in l:
-        found = False
-        for mm in m:
-            if m[mm] == ll:
-                erg.append(my_eval(mm).nnf())
-                found = True
-                break
-        if(found == False):
-            for mm in m:
-                if m[mm] + ll == 0:
-                    erg.append(my_eval(mm).getNegation().nnf())
+        a = atoms.get(abs(ll))
+        if a is None:
+            raise ValueError("Variable " + str(abs(ll)) + " is not in the map")
+        a = sub_to_atoms(a)
+        if ll > 0:
+            erg.append(a.nnf())
+        else:
+            erg.append(a.getNegation().nnf())
     return erg
 
 
-def convert_formula_to_pyeda(formula):
-    if isinstance(formula, Not):
-        return pyeda.inter.Not(convert_formula_to_pyeda(formula.f1))
-    if isinstance(formula, And):
-        return pyeda.inter.And(convert_formula_to_pyeda(formula.f1), convert_formula_to_pyeda(formula.f2)) 
-    if isinstance(formula, Or):
-        return pyeda.inter.Or(convert_formula_to_pyeda(formula.f1), convert_formula_to_pyeda(formula.f2))
-    if isinstance(formula, Impl):
-        return pyeda.inter.Implies(convert_formula_to_pyeda(formula.f1), convert_formula_to_pyeda(formula.f2))
-    if isinstance(formula, BiImpl):
-        return pyeda.inter.Equal(convert_formula_to_pyeda(formula.f1), convert_formula_to_pyeda(formula.f2))
-    return pyeda.inter.expr("v"+bytearray(str(formula).encode()).hex())
+def convert_formula_to_pyeda(formula, symbols = None):
+    """ Converts a formula to a pyeda expression.
+
+    Without a symbol table, each atom becomes a variable whose name
+    encodes the atom, so conversions need no shared state. With a
+    SymbolTable, e.g., one per session, the atoms become the variables
+    v[1], v[2], ... of their indices in the table.
+    """
+    connectives = {Not: pyeda.inter.Not, And: pyeda.inter.And, Or: pyeda.inter.Or,
+                   Impl: pyeda.inter.Implies, BiImpl: pyeda.inter.Equal}
+
+    def children(f):
+        if isinstance(f, Not):
+            return [f.f1]
+        if isinstance(f, (And, Or, Impl, BiImpl)):
+            return [f.f1, f.f2]
+        return []
+
+    def combine(f, args):
+        if isinstance(f, (Not, And, Or, Impl, BiImpl)):
+            return connectives[type(f)](*args)
+        if symbols is not None:
+            return pyeda.inter.exprvar("v", symbols.index(sub_to_atoms(f)))
+        return pyeda.inter.exprvar("v" + repr(sub_to_atoms(f)).encode().hex())
+
+    return _postorder(formula, children, combine)
 
 
-def convert_pyeda_atom_to_hera(atom):
-    return my_eval(bytearray.fromhex(str(atom)[1:]).decode())
+def convert_pyeda_atom_to_hera(atom, symbols = None):
+    if symbols is not None:
+        return symbols.atom(atom.indices[0])
+    return parse_formula(bytes.fromhex(atom.name[1:]).decode())
 
 
-def convert_pyeda_model_to_hera(model):
+def convert_pyeda_model_to_hera(model, symbols = None):
     m = set()
     for v in model:
         if model[v] == 1:
-            m.add(convert_pyeda_atom_to_hera(v))
+            m.add(convert_pyeda_atom_to_hera(v, symbols))
         else:
-            m.add(Not(convert_pyeda_atom_to_hera(v)))
+            m.add(Not(convert_pyeda_atom_to_hera(v, symbols)))
     return m
 
 
-def convert_hera_model_to_pyeda(model):
+def convert_hera_model_to_pyeda(model, symbols = None):
     m = dict()
     for l in model:
         if isinstance(l, Not):
-            m[str(l.f1)] = 0
+            m[convert_formula_to_pyeda(l.f1, symbols)] = 0
         else:
-            m[str(l)] = 1
+            m[convert_formula_to_pyeda(l, symbols)] = 1
     return m
 
 
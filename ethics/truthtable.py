@@ -0,0 +1,119 @@
+from ethics.language import *
+from ethics.allsat import occurrence_order
+import numpy
+
+# Largest number of atoms a table may span (2^20 rows of one byte per column)
+MAX_ATOMS = 20
+
+
+def leaves(formula):
+    """ The atoms spanning the truth table of a formula, see occurrence_order. """
+    return occurrence_order(formula)
+
+
+class TruthTable():
+    """ All 2^n assignments to n atoms, as columns of NumPy boolean arrays.
+
+    Row r assigns True to the i-th atom iff bit i of r is set. A formula
+    over these atoms is compiled into one vectorised operation per
+    connective and evaluated for all rows at once. Columns of subformulae
+    are cached, so a batch of queries sharing subformulae (e.g., one
+    premise and many conclusions) evaluates each of them only once.
+
+    Keyword arguments:
+    atoms --- The atoms spanning the table
+    axioms --- Clauses (lists of literals) restricting the rows that count as models
+    """
+    def __init__(self, atoms, axioms = ()):
+        self.atoms = list(atoms)
+        if len(self.atoms) > MAX_ATOMS:
+            raise ValueError("Truth table over " + str(len(self.atoms)) + " atoms exceeds " + str(MAX_ATOMS))
+        self.index = {a: i for i, a in enumerate(self.atoms)}
+        rows = numpy.arange(2**len(self.atoms), dtype = numpy.uint32)
+        self.columns = [((rows >> i) & 1).astype(bool) for i in range(len(self.atoms))]
+        self.cache = dict()
+        self.valid = self.evaluate_clauses(axioms)
+
+    def evaluate(self, formula):
+        """ The column of the formula, i.e., its truth value in each row. """
+        stack = [formula]
+        while stack:
+            f = stack[-1]
+            if f in self.cache:
+                stack.pop()
+                continue
+            if isinstance(f, Not):
+                children = [f.f1]
+            elif isinstance(f, (And, Or, Impl, BiImpl)):
+                children = [f.f1, f.f2]
+            elif isinstance(f, Bool):
+                self.cache[f] = numpy.full(2**len(self.atoms), f.f1, dtype = bool)
+                stack.pop()
+                continue
+            else:
+                self.cache[f] = self.columns[self.index[f]]
+                stack.pop()
+                continue
+            pending = [c for c in children if c not in self.cache]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if isinstance(f, Not):
+                self.cache[f] = ~self.cache[f.f1]
+            elif isinstance(f, And):
+                self.cache[f] = self.cache[f.f1] & self.cache[f.f2]
+            elif isinstance(f, Or):
+                self.cache[f] = self.cache[f.f1] | self.cache[f.f2]
+            elif isinstance(f, Impl):
+                self.cache[f] = ~self.cache[f.f1] | self.cache[f.f2]
+            else:
+                self.cache[f] = self.cache[f.f1] == self.cache[f.f2]
+        return self.cache[formula]
+
+    def evaluate_clauses(self, clauses):
+        """ The rows satisfying all clauses (lists of literals over the atoms). """
+        result = numpy.ones(2**len(self.atoms), dtype = bool)
+        for clause in clauses:
+            satisfied = numpy.zeros(2**len(self.atoms), dtype = bool)
+            for l in clause:
+                if isinstance(l, Not):
+                    satisfied |= ~self.columns[self.index[l.f1]]
+                else:
+                    satisfied |= self.columns[self.index[l]]
+            result &= satisfied
+        return result
+
+    def rows(self, formula):
+        """ The models of the formula as boolean mask over the rows. """
+        return self.evaluate(formula) & self.valid
+
+    def satisfiable(self, formula):
+        return bool(self.rows(formula).any())
+
+    def entails(self, premise, conclusion):
+        return not (self.rows(premise) & ~self.evaluate(conclusion)).any()
+
+    def count(self, formula):
+        """ The number of models over all atoms of the table. """
+        return int(numpy.count_nonzero(self.rows(formula)))
+
+    def models(self, formula):
+        """ The models as bit array with one row per model and one column per atom. """
+        rows = self.rows(formula).nonzero()[0].astype(numpy.uint32)
+        return ((rows[:, None] >> numpy.arange(len(self.atoms), dtype = numpy.uint32)) & 1).astype(bool)
+
+    def satisfiable_all(self, formulae):
+        return [self.satisfiable(f) for f in formulae]
+
+    def entails_all(self, premise, conclusions):
+        """ For each conclusion, whether the premise entails it. """
+        return [self.entails(premise, c) for c in conclusions]
+
+    def bits(self, column):
+        """ A column as integer, bit r is set iff row r is True. """
+        return int.from_bytes(numpy.packbits(column, bitorder = "little").tobytes(), "little")
+
+    def model(self, row):
+        """ The assignment of a row as set of literals. """
+        return {a if (row >> i) & 1 else Not(a) for i, a in enumerate(self.atoms)}
@@ -0,0 +1,48 @@
+"""
+Times the prime compilation strategies on the formulae of
+test_primes_performance.py. Every run is a subprocess, so a strategy
+that takes too long is stopped without stopping the others.
+
+Usage: python test/benchmark_primes.py [timeout in seconds] [strategy ...]
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ethics.primes import PrimeCompilator, strategies
+from test_primes_performance import formulae
+
+
+def run(name, strategy):
+    """ Compiles one formula and prints the number of primes and the time. """
+    start = time.time()
+    compilator = PrimeCompilator(formulae[name](), strategy)
+    implicants, implicates = compilator.compile()
+    print(len(compilator.atoms), len(implicants), len(implicates), round(time.time() - start, ndigits=4))
+
+
+def benchmark(timeout, names):
+    print("%-24s%-12s%8s%12s%12s%12s" % ("formula", "strategy", "atoms", "implicants", "implicates", "seconds"))
+    for name in formulae:
+        for strategy in names:
+            try:
+                out = subprocess.run([sys.executable, __file__, "--run", name, strategy], timeout=timeout,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            except subprocess.TimeoutExpired:
+                row = ["-", "-", "-", "> " + str(timeout)]
+            else:
+                lines = out.stdout.split()
+                row = lines if out.returncode == 0 else ["-", "-", "-", out.stderr.strip().splitlines()[-1].split(":")[0]]
+            print("%-24s%-12s%8s%12s%12s%12s" % tuple([name, strategy] + row), flush=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["--run"]:
+        run(sys.argv[2], sys.argv[3])
+    else:
+        timeout = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+        benchmark(timeout, sys.argv[2:] or list(strategies))
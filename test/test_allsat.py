@@ -0,0 +1,55 @@
+import unittest
+import itertools
+import random
+from ethics.language import *
+from ethics.allsat import sat, iter_cubes
+
+
+class TestAllSat(unittest.TestCase):
+
+    def random_formula(self, rng, atoms, depth):
+        if depth == 0 or rng.random() < 0.2:
+            return Atom(rng.choice(atoms))
+        op = rng.choice([Not, And, Or, Impl, BiImpl])
+        if op is Not:
+            return Not(self.random_formula(rng, atoms, depth - 1))
+        return op(self.random_formula(rng, atoms, depth - 1), self.random_formula(rng, atoms, depth - 1))
+
+    def evaluate(self, f, model):
+        if isinstance(f, Not):
+            return not self.evaluate(f.f1, model)
+        if isinstance(f, And):
+            return self.evaluate(f.f1, model) and self.evaluate(f.f2, model)
+        if isinstance(f, Or):
+            return self.evaluate(f.f1, model) or self.evaluate(f.f2, model)
+        if isinstance(f, Impl):
+            return not self.evaluate(f.f1, model) or self.evaluate(f.f2, model)
+        if isinstance(f, BiImpl):
+            return self.evaluate(f.f1, model) == self.evaluate(f.f2, model)
+        return model[f]
+
+    def test_sat(self):
+        self.assertEqual(sat(Or("a", "b"), ["a", "b"]), [{"a": False, "b": True}, {"a": True}])
+        self.assertEqual(sat(And(Atom("a"), Not(Atom("a"))), ["a"]), [])
+        self.assertEqual(sat(Or(Atom("a"), Not(Atom("a"))), ["a"]), [{}])
+        self.assertEqual(sat(Bool(True), []), [{}])
+        self.assertEqual(list(iter_cubes(Impl("a", "b"), ["b", "a"])), [[-2], [1, 2]])
+
+    def test_cubes_partition_models(self):
+        rng = random.Random(0)
+        atoms = ["a", "b", "c", "d", "e"]
+        for _ in range(200):
+            f = self.random_formula(rng, atoms, 4)
+            covered = []
+            for cube in sat(f, atoms):
+                free = [a for a in atoms if a not in cube]
+                for values in itertools.product([False, True], repeat=len(free)):
+                    covered.append(tuple(sorted({**cube, **dict(zip(free, values))}.items())))
+            models = [tuple(sorted(zip(atoms, values))) for values in itertools.product([False, True], repeat=len(atoms))
+                      if self.evaluate(f, dict(zip(atoms, values)))]
+            self.assertEqual(len(covered), len(set(covered)))
+            self.assertEqual(set(covered), set(models))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import time
+from ethics.language import *
+from ethics.cam.semantics import CausalModel
+from ethics.cam.principles import ParetoPrinciple, DoubleEffectPrinciple
+
+cases = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cases", "cam")
+
+
+class TestCausalModel(unittest.TestCase):
+
+    def worlds(self, case):
+        models = [CausalModel(os.path.join(cases, case), {"disclosing": 1, "refraining": 0}),
+                  CausalModel(os.path.join(cases, case), {"disclosing": 0, "refraining": 1})]
+        for m in models:
+            m.alternatives = models
+        return models
+
+    def test_chained_mechanisms(self):
+        # help := disclosing and healthy := help, so disclosing makes both true
+        disclosing, refraining = self.worlds("disclose_doctor.json")
+        self.assertTrue(disclosing.models(And("help", "healthy")))
+        self.assertTrue(refraining.models(And(Not("help"), Not("healthy"))))
+        self.assertEqual(disclosing.compute_layers(), {0: {"disclosing", "refraining"}, 1: {"help"}, 2: {"healthy"}})
+        disclosing, refraining = self.worlds("disclose_burglar.json")
+        self.assertTrue(disclosing.models(And("help", "robbed")))
+        self.assertTrue(refraining.models(And(Not("help"), Not("robbed"))))
+
+    def test_chained_mechanisms_verdict(self):
+        for m in self.worlds("disclose_doctor.json"):
+            self.assertTrue(m.evaluate(ParetoPrinciple))
+
+    def test_explanation_budget(self):
+        # Explaining this world completely takes minutes
+        m = CausalModel(os.path.join(cases, "lying-robot2.json"), {"lying_0": 1, "asking_0": 0, "refraining_0": 0,
+                                                                   "lying_1": 1, "asking_1": 0, "refraining_1": 0})
+        m.alternatives = [m]
+        p = DoubleEffectPrinciple(m)
+        start = time.monotonic()
+        first = p.explain(budget = 0.5)
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertFalse(first["complete"])
+        second = p.explain(budget = 0.5)
+        self.assertLessEqual(first["sufficient"], second["sufficient"])
+        # A new k starts a new search
+        shortest = p.explain(k = 1, budget = 30)
+        self.assertTrue(shortest["complete"])
+        self.assertEqual([len(shortest["sufficient"]), len(shortest["necessary"])], [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import itertools
+import random
+import tempfile
+import os
+from ethics.language import *
+from ethics.explanations import iter_hitting_sets, iter_prime_implicants, iter_prime_implicates, compute_primes, PrimeCache, \
+    consistent_terms, remove_trivial_clauses, Valuation, generate_inus_reasons, AnytimeReasons, Budget, generate_reasons
+from ethics.solver import satisfiable
+
+
+class SetModel:
+    def models(self, f):
+        if isinstance(f, Not):
+            return not self.models(f.f1)
+        return f in ("a", "b", "d")
+
+
+class FormulaPrinciple:
+    def __init__(self, formula):
+        self.formula = formula
+
+    def permissible(self):
+        return True
+
+    def buildConjunction(self):
+        return self.formula
+
+
+class TestExplanations(unittest.TestCase):
+
+    def test_hitting_sets(self):
+        sets = [{"a", "b"}, {"b", "c"}, {"c", "d", "e"}, {"a", "e"}]
+        result = list(iter_hitting_sets(sets))
+        universe = sorted(set().union(*sets))
+        hitting = [set(c) for n in range(len(universe) + 1) for c in itertools.combinations(universe, n)
+                   if all(set(c) & s for s in sets)]
+        minimal = [h for h in hitting if not any(g < h for g in hitting)]
+        self.assertEqual(sorted(map(sorted, result)), sorted(map(sorted, minimal)))
+        self.assertEqual([len(r) for r in result], sorted(len(r) for r in result))
+        self.assertEqual(list(iter_hitting_sets([])), [[]])
+        self.assertEqual(list(iter_hitting_sets([set()])), [])
+        self.assertEqual(list(iter_hitting_sets(sets, {"b", "c", "e"})), [["b", "e"]])
+
+    def test_primes_in_increasing_size(self):
+        f = Or(And("a", "b"), And(Not("a"), And("c", "d")))
+        cants = list(iter_prime_implicants(f))
+        self.assertEqual({frozenset(t) for t in cants},
+                         {frozenset(t) for t in [["a", "b"], [Not("a"), "c", "d"], ["b", "c", "d"]]})
+        self.assertEqual([len(t) for t in cants], [2, 3, 3])
+        self.assertEqual({frozenset(c) for c in iter_prime_implicates(f)},
+                         {frozenset(c) for c in compute_primes(f)[1]})
+
+    def test_implicants_respect_theory(self):
+        f = And(Not(Good("a")), Or(Bad("a"), "c"))
+        self.assertEqual(list(iter_prime_implicants(f)), [[Bad("a")], [Not(Good("a")), "c"]])
+
+    def test_consistent_terms(self):
+        terms = [["a", Not("b")], ["a", Not("a")], [Good("a"), Bad("a")], [Causes("a", "b"), Not("a")],
+                 [Causes("a", "b"), "a", "b"], [Gt(U("a"), U("b")), Gt(U("b"), U("a"))], [Eq(U("a"), U("a"))],
+                 [Not(Eq(U("a"), U("a")))], [], [Or("a", "b"), Not("a")]]
+        self.assertEqual(consistent_terms(terms), [satisfiable(Formula.makeConjunction(t)) for t in terms])
+        self.assertEqual(consistent_terms(terms), [True, False, False, False, True, False, True, False, True, True])
+        self.assertEqual(remove_trivial_clauses([["a", Not("a")], [Not(Good("a")), Not(Bad("a"))], ["a", "b"]]), [["a", "b"]])
+
+    def test_valuation(self):
+        class CountingModel:
+            def __init__(self):
+                self.calls = []
+
+            def models(self, f):
+                self.calls.append(f)
+                if isinstance(f, Not):
+                    return not self.models(f.f1)
+                if isinstance(f, Or):
+                    return self.models(f.f1) or self.models(f.f2)
+                return f in ("a", Caused("b"))
+
+        model = CountingModel()
+        valuation = Valuation(model)
+        self.assertTrue(valuation.satisfies(["a", Caused("b")]))
+        self.assertFalse(valuation.satisfies(["a", Not(Caused("b"))]))
+        self.assertEqual([valuation.holds(l) for l in ["c", Not("c"), Not("a")]], [False, True, False])
+        self.assertEqual(model.calls, ["a", Caused("b"), "c"])
+        self.assertTrue(valuation.holds(Or("c", "a")))
+
+    def test_inus_reasons(self):
+        rng = random.Random(0)
+        literals = [Atom(a) for a in "abcdefg"] + [Not(Atom(a)) for a in "abcdefg"]
+        for _ in range(50):
+            suff = {Formula.makeConjunction(rng.sample(literals, rng.randint(1, 5))) for _ in range(rng.randint(0, 8))}
+            nec = {Formula.makeDisjunction(rng.sample(literals, rng.randint(1, 3))) for _ in range(rng.randint(0, 8))}
+            reasons = [{"reason": r, "type": "sufficient"} for r in suff] + [{"reason": r, "type": "necessary"} for r in nec]
+            expected = {Formula.makeDisjunction(rn.getClause()) for rn in nec
+                        if any(set(rn.getClause()) <= set(rs.getConj()) for rs in suff)}
+            self.assertEqual(generate_inus_reasons(reasons), expected)
+
+    def test_anytime_reasons(self):
+        f = And(Or(And("a", "b"), And(Not("a"), "c")), Or("d", "e"))
+        model = SetModel()
+        expected = AnytimeReasons(model, True, f).run()
+        anytime = AnytimeReasons(model, True, f)
+        self.assertEqual(anytime.run(Budget(steps = 1)), [])
+        self.assertFalse(anytime.complete)
+        runs = 1
+        while not anytime.complete:
+            reasons = anytime.run(Budget(steps = 2))
+            runs += 1
+        self.assertGreater(runs, 2)
+        self.assertEqual(reasons, expected)
+        self.assertEqual({r["reason"] for r in reasons if r["type"] == "sufficient"}, {And(And("a", "b"), "d")})
+        self.assertFalse(AnytimeReasons(SetModel(), True, f).run(Budget(seconds = 0)))
+
+    def test_fewer_reasons_than_k(self):
+        # The enumeration ends when the primes run out, with the reasons
+        # of generate_reasons, literals in the same order
+        f = And(Or(And("a", Not("c")), And("b", "d")), Or(Not("c"), "e"))
+        principle = FormulaPrinciple(f)
+        expected = {(r["type"], r["reason"]) for r in generate_reasons(SetModel(), principle)}
+        self.assertEqual(len(expected), 7)
+        anytime = AnytimeReasons(SetModel(), True, f, 10)
+        reasons = anytime.run(Budget(steps = 100))
+        self.assertTrue(anytime.complete)
+        self.assertEqual({(r["type"], r["reason"]) for r in reasons}, expected)
+        self.assertEqual({(r["type"], r["reason"]) for r in generate_reasons(SetModel(), principle, k = 10)}, expected)
+
+    def test_prime_cache(self):
+        def normal(primes):
+            return tuple({frozenset(p) for p in ps} for ps in primes)
+
+        f = And(Or("a", Bad("b")), Not(Causes("a", "b")))
+        g = And(Or("x", Bad("y")), Not(Causes("x", "y")))
+        with tempfile.TemporaryDirectory() as directory:
+            cache = PrimeCache(directory = directory)
+            self.assertEqual(cache.primes(f), compute_primes(f))
+            self.assertEqual(normal(cache.primes(g)), normal(compute_primes(g)))
+            self.assertEqual(cache.info()[:2], (1, 1))
+            cache = PrimeCache(directory = directory)
+            self.assertEqual(normal(cache.primes(g)), normal(compute_primes(g)))
+        h = And(Or("x", Bad("x")), Not(Causes("x", "x")))
+        self.assertEqual(normal(cache.primes(h)), normal(compute_primes(h)))
+        with tempfile.TemporaryDirectory() as directory:
+            cache = PrimeCache(directory = directory, strategy = "dualise")
+            self.assertEqual(normal(cache.primes(g)), normal(compute_primes(g, "dualise")))
+            self.assertEqual(cache.info()[:2], (0, 0))
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_reasons_are_prime(self):
+        # Good(a) excludes Bad(a), dualising the models keeps both literals
+        f = And(Good("a"), Not(Bad("a")))
+        self.assertEqual(compute_primes(f), ([[Good("a")]], [[Good("a")], [Not(Bad("a"))]]))
+        self.assertEqual([set(t) for t in compute_primes(f, "dualise")[0]], [{Good("a"), Not(Bad("a"))}])
+        self.assertEqual(compute_primes(Not(True)), ([], [[]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
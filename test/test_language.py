@@ -0,0 +1,119 @@
+import unittest
+import copy
+import pickle
+import itertools
+from ethics.language import *
+
+
+class TestLanguage(unittest.TestCase):
+
+    def test_interning(self):
+        self.assertIs(And("a", Not("b")), And(Atom("a"), Not(Atom("b"))))
+        self.assertIs(Gt(U(And("a", "b")), 0), Gt(U(And("a", "b")), 0))
+        self.assertIs(Atom("a"), Atom("a"))
+
+    def test_equality(self):
+        self.assertEqual(Not("a"), Not(Atom("a")))
+        self.assertNotEqual(Not("a"), Good("a"))
+        self.assertNotEqual(Or("a", "b"), Or("b", "a"))
+        self.assertEqual(Atom("a"), "a")
+        self.assertEqual(hash(Causes("a", "b")), hash(Causes(Atom("a"), "b")))
+
+    def test_atoms_inside_formulae(self):
+        self.assertIsInstance(Not("a").f1, Atom)
+        self.assertIsInstance(U("a").t1, Atom)
+        self.assertEqual(repr(And("a", Not("b"))), "And('a', Not('b'))")
+
+    def test_repr(self):
+        f = Causes(And("a", Not("b")), Gt(DR("a", Minus("b")), 0))
+        self.assertEqual(repr(f), "Causes(And('a', Not('b')), Gt(DR('a', +Minus('b')), 0))")
+        self.assertIs(repr(f), repr(f))
+        self.assertIs(repr(And("a", Not("b"))), str(f.f1))
+        self.assertEqual(repr(Same("a", "b")), "Same('a', 'b')")
+
+    def test_immutable(self):
+        f = And("a", "b")
+        with self.assertRaises(AttributeError):
+            f.f1 = Atom("c")
+        with self.assertRaises(AttributeError):
+            Atom("a").f1 = "c"
+
+    def test_copy_and_pickle(self):
+        f = And(Causes("a", Not("b")), Gt(U("a"), 0))
+        self.assertIs(copy.deepcopy(f), f)
+        self.assertIs(pickle.loads(pickle.dumps(f)), f)
+        self.assertIs(pickle.loads(pickle.dumps(Atom("a"))), Atom("a"))
+
+    def test_serialize(self):
+        model = {Atom("a"), Not(Causes("a", "b")), Gt(Add(U("a"), 2), 1.5), Bool(True), Bool("False")}
+        self.assertEqual(set(deserialize(serialize(model))), model)
+        f = Formula.makeConjunction([Or("a" + str(i), Not("b")) for i in range(20000)])
+        data = serialize([f, f.f1])
+        self.assertLess(len(data), 20 * 40000)
+        self.assertEqual(deserialize(data), [f, f.f1])
+        self.assertIs(pickle.loads(pickle.dumps(f)), f)
+        with self.assertRaises(ValueError):
+            deserialize(b"And('a', 'b')")
+        data = serialize([And(Good("a"), Gt(U("a"), 2))])
+        for n in range(4, len(data)):
+            with self.assertRaises(ValueError):
+                deserialize(data[:n])
+
+    def test_tseitin(self):
+        def sat(clauses):
+            n = max(abs(l) for c in clauses for l in c)
+            return any(all(any(v[abs(l) - 1] == (l > 0) for l in c) for c in clauses)
+                       for v in itertools.product([False, True], repeat=n))
+        self.assertEqual(And(Or("a", Not("b")), Good("c")).tseitin(), ([[1, -2], [3]], {"a": 1, "b": 2, Good("c"): 3}))
+        self.assertTrue(sat(Or(And("a", "b"), Not(Impl("a", "c"))).tseitin()[0]))
+        self.assertFalse(sat(And(BiImpl("a", Not("b")), Or(And("a", "b"), Not(Or("a", "b")))).tseitin()[0]))
+
+    def test_constants_in_clauses(self):
+        self.assertEqual(And("a", Bool(False)).tseitin(), ([[1], []], {"a": 1}))
+        self.assertEqual(And("a", Bool(False)).dimacs(), ([[1], []], {"a": 1}))
+        self.assertEqual(And(Or("a", Bool(True)), Or("b", Not(True))).tseitin(), ([[2]], {"a": 1, "b": 2}))
+        self.assertEqual(Or("a", Bool(True)).dimacs(), ([], {"a": 1}))
+        clauses, m = Or(And("a", Bool(False)), "b").tseitin()
+        self.assertEqual(set(m), {"a", "b"})
+        self.assertIn([-2], clauses)
+
+    def test_tseitin_is_linear(self):
+        f = Formula.makeDisjunction([And("a" + str(i), "b" + str(i)) for i in range(40)])
+        clauses, m = f.tseitin()
+        self.assertEqual(len(m), 80)
+        self.assertLess(len(clauses), 4 * 80)
+
+    def test_simplify(self):
+        self.assertIs(And(And("a", "b"), And("a", True)).simplify(), And("a", "b"))
+        self.assertIs(Or("a", And("b", "a")).simplify(), Atom("a"))
+        self.assertIs(And(Or("a", "b"), Or(Or("b", "c"), "a")).simplify(), Or("a", "b"))
+        self.assertIs(Impl(True, And("a", Not(Not("b")))).simplify(), And("a", "b"))
+        self.assertIs(Impl("a", Bool(False)).simplify(), Not("a"))
+        self.assertIs(BiImpl(Good("a"), Good("a")).simplify(), Bool(True))
+        self.assertIs(Formula.makeConjunction(["a", "b", Not("a")]).simplify(), Bool(False))
+        self.assertIs(Or(Not(True), Causes(And("a", "a"), "b")).simplify(), Causes(And("a", "a"), "b"))
+
+    def test_simplify_keeps_order(self):
+        f = Formula.makeConjunction([Good("c"), "a", Or("b", "d")])
+        self.assertIs(f.simplify(), f)
+
+    def test_deep_formulae(self):
+        n = 20000
+        atoms = ["a" + str(i) for i in range(n)]
+        f = Formula.makeConjunction([Or(a, Not("b")) for a in atoms])
+        self.assertEqual(len(f.asClauseList()), n)
+        self.assertEqual(len(f.getAllCALLiterals()), 2 * n)
+        self.assertIs(Not(f).nnf().nnf(), Not(f).nnf())
+        self.assertIs(f.cnf_it(), f)
+        self.assertTrue(repr(f).startswith("And(And("))
+        g = Formula.makeDisjunction(atoms)
+        self.assertEqual(g.asConjList(), [[Atom(a)] for a in atoms])
+
+    def test_nnf(self):
+        self.assertIs(Not(Impl("a", BiImpl("b", Not("c")))).nnf(), And("a", And(Or(Not("b"), "c"), Or("b", Not("c")))))
+        self.assertIs(Not(Bool(True)).nnf(), Bool(False))
+        self.assertIs(Or(And("a", "b"), "c").cnf(), And(Or("a", "c"), Or("b", "c")))
+
+
+if __name__ == '__main__':
+    unittest.main()
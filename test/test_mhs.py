@@ -0,0 +1,54 @@
+import unittest
+import itertools
+import random
+from ethics.mhs import hitting_sets, mhs, growing_hitting_sets
+
+
+class TestMinimalHittingSets(unittest.TestCase):
+
+    def brute_force(self, sets):
+        elements = sorted(set(itertools.chain(*sets)))
+        hitting = [set(c) for n in range(len(elements) + 1) for c in itertools.combinations(elements, n)
+                   if all(set(c) & set(s) for s in sets)]
+        return {frozenset(h) for h in hitting if not any(g < h for g in hitting)}
+
+    def test_hitting_sets(self):
+        self.assertEqual(hitting_sets([["a", "b"], ["b", "c"]]), [["a", "c"], ["b"]])
+        self.assertEqual(hitting_sets([]), [[]])
+        self.assertEqual(hitting_sets([["a"], []]), [])
+        rng = random.Random(0)
+        for _ in range(300):
+            sets = [rng.sample("abcdefgh", rng.randint(1, 4)) for _ in range(rng.randint(1, 6))]
+            result = hitting_sets(sets)
+            self.assertEqual(len(result), len({frozenset(h) for h in result}))
+            self.assertEqual({frozenset(h) for h in result}, self.brute_force(sets))
+
+    def test_mhs(self):
+        self.assertEqual(sorted(mhs([[0, 2], [1, 2], [2, 3]])), [[0, 1, 3], [2]])
+        self.assertEqual(mhs([]), [[]])
+        self.assertEqual(mhs([[]]), [])
+
+    def test_growing_hitting_sets(self):
+        # Each yielded set missing a hidden set gets that set appended,
+        # as a counter-model would, until the whole family is known
+        rng = random.Random(0)
+        for _ in range(200):
+            hidden = [rng.sample(range(8), rng.randint(1, 4)) for _ in range(rng.randint(1, 6))]
+            bitsets = [sum(1 << e for e in s) for s in hidden]
+            sets = [bitsets[0]]
+            found = []
+            for h in growing_hitting_sets(sets, 8):
+                if h is None:
+                    continue
+                missed = [s for s in bitsets if not s & h]
+                if missed:
+                    sets.append(missed[0])
+                else:
+                    found.append(h)
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual([bin(h).count("1") for h in found], sorted(bin(h).count("1") for h in found))
+            self.assertEqual({frozenset(e for e in range(8) if h >> e & 1) for h in found}, self.brute_force(hidden))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import time
+import random
+from ethics.mhs import hitting_sets
+from ethics.language import *
+from ethics.solver import smt_all_models
+try:
+    from ethics.extensions.mhsModule import hitting_sets as c_hitting_sets
+except ImportError:
+    c_hitting_sets = None
+
+
+class TestMinimalHittingSetsPerformance(unittest.TestCase):
+    """ Compares the pure Python minimal hitting sets with the C extension, if it is built. """
+
+    def compare(self, name, sets):
+        start = time.time()
+        result = hitting_sets(sets)
+        elapsed = time.time() - start
+        line = name + ": " + str(len(result)) + " sets, python " + str(round(elapsed, ndigits=4)) + "s"
+        if c_hitting_sets is not None:
+            start = time.time()
+            expected = c_hitting_sets(sets)
+            line += ", C " + str(round(time.time() - start, ndigits=4)) + "s"
+            self.assertEqual({frozenset(h) for h in result}, {frozenset(h) for h in expected})
+        print(line)
+
+    def test_random_families(self):
+        rng = random.Random(1)
+        elements = ["x" + str(i) for i in range(30)]
+        sets = [rng.sample(elements, rng.randint(2, 6)) for _ in range(40)]
+        self.compare("random", sets)
+
+    def test_models_of_DoubleEffectPrinciple(self):
+        consequences = {"c1": True, "c2": False, "c3": True}
+        formulae = [Formula.makeConjunction([Impl(Bad(Atom(c)), Not(Goal(Atom(c)))) for c in consequences])]
+        formulae += [Formula.makeDisjunction([And(Good(Atom(c)), Goal(Atom(c))) for c in consequences])]
+        formulae += [Formula.makeConjunction([Impl(Bad(Atom(c)), Not(Instrumental(Atom(c)))) for c in consequences])]
+        models = smt_all_models(Formula.makeConjunction(formulae))
+        self.compare("double effect models", [[str(l) for l in m] for m in models])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import time
-from ethics.primes import PrimeCompilator
+import random
+from ethics.primes import PrimeCompilator, compile_primes, strategies, iter_bdd_primes, select_strategy
 from ethics.language import *
 
 
@@ -105,6 +106,74 @@ class TestPrimes(unittest.TestCase):
         self.assertEqual(result[0], [['a', 'b'], [Not('a'), Not('b')]])
         self.assertEqual(result[1], [[Not('a'), 'b'], [Not('b'), 'a']])
 
+    def random_formula(self, rng, atoms, depth):
+        if depth == 0 or rng.random() < 0.25:
+            return rng.choice(atoms)
+        op = rng.choice([Not, And, Or, Impl, BiImpl])
+        if op is Not:
+            return Not(self.random_formula(rng, atoms, depth - 1))
+        return op(self.random_formula(rng, atoms, depth - 1), self.random_formula(rng, atoms, depth - 1))
+
+    def test_strategies(self):
+        for strategy in strategies:
+            pc = PrimeCompilator(Or("a", And("b", "c")), strategy)
+            self.assertEqual(self.sortedResult(pc.compile()), ([["a"], ["b", "c"]], [["a", "b"], ["a", "c"]]))
+        # Valid modulo the axioms, Good(a) and Bad(a) exclude each other
+        f = Or(Not(Good("a")), Not(Bad("a")))
+        for strategy in ("bdd", "truthtable", "stream"):
+            self.assertEqual(compile_primes(f, strategy), ([[]], []))
+            self.assertEqual(self.sortedResult(compile_primes(f, strategy, theory=False)),
+                             ([[Not(Bad("a"))], [Not(Good("a"))]], [[Not(Bad("a")), Not(Good("a"))]]))
+        self.assertRaises(ValueError, compile_primes, f, "quine")
+
+    def test_select_strategy(self):
+        self.assertEqual(select_strategy(Or(Good("a"), And("b", True))), "truthtable")
+        self.assertEqual(select_strategy(Formula.makeDisjunction(["a" + str(i) for i in range(6)])), "bdd")
+        f = Or(Good("a"), Impl("b", Bad("a")))
+        self.assertEqual(self.sortedResult(compile_primes(f)), self.sortedResult(compile_primes(f, "bdd")))
+
+    def test_negation_heuristic(self):
+        # Three of four assignments are models, so the negation is compiled
+        pc = PrimeCompilator(Or("a", Not("b")))
+        self.assertTrue(pc.using_negation)
+        self.assertEqual(self.sortedResult(pc.compile()), ([["a"], [Not("b")]], [[Not("b"), "a"]]))
+        self.assertFalse(PrimeCompilator(And("a", "b")).using_negation)
+        # The models are counted without recursion
+        f = Formula.makeConjunction([Or("a" + str(i), "b" + str(i)) for i in range(300)])
+        self.assertFalse(PrimeCompilator(f).using_negation)
+
+    def test_deep_bdd(self):
+        # More BDD levels than the recursion limit
+        atoms = [Atom("a" + str(i)) for i in range(1000)]
+        implicants, implicates = compile_primes(Formula.makeConjunction(atoms), "bdd")
+        self.assertEqual(implicants, [atoms])
+        self.assertEqual(implicates, [[a] for a in atoms])
+        implicants, implicates = compile_primes(Formula.makeDisjunction(atoms), "bdd")
+        self.assertEqual((len(implicants), len(implicates)), (1000, 1))
+
+    def test_iter_bdd_primes(self):
+        f = Or(And("a", "b"), And(Not("a"), "c"))
+        implicants = iter_bdd_primes(f)
+        self.assertEqual(next(implicants), ["b", "c"])
+        self.assertEqual(sorted(map(str, implicants)), sorted(map(str, [["a", "b"], [Not("a"), "c"]])))
+        self.assertEqual(self.sortedResult(([], iter_bdd_primes(f, implicates=True))),
+                         ([], [["a", "c"], ["b", "c"], [Not("a"), "b"]]))
+
+    def test_strategies_agree(self):
+        rng = random.Random(0)
+        plain = [Atom("a"), Atom("b"), Atom("c"), Atom("d")]
+        cal = [Atom("a"), Atom("b"), Good("a"), Bad("a"), Neutral("a"), Causes("a", "b")]
+        for i in range(100):
+            atoms = plain if i % 2 else cal
+            f = self.random_formula(rng, atoms, 4)
+            for theory in (False, True):
+                expected = self.sortedResult(compile_primes(f, "truthtable", theory))
+                self.assertEqual(self.sortedResult(compile_primes(f, "bdd", theory)), expected)
+                self.assertEqual(self.sortedResult(compile_primes(f, "stream", theory)), expected)
+                # The models of the solver only dualise exactly without CAL atoms
+                if atoms is plain or not theory:
+                    self.assertEqual(self.sortedResult(compile_primes(f, "dualise", theory)), expected)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+from ethics.language import *
+from ethics.solver import satisfiable, entails, smt_all_models, smt_iter_models, theory_sat, BDDSolver, CDCLSession, select_backend, use_backend, count_models, cache_info, cache_clear, set_cache_size, backends
+from ethics.cdcl import CDCLSolver
+
+
+class TestSolver(unittest.TestCase):
+
+    def test_satisfiable(self):
+        self.assertTrue(satisfiable(Or("a", "b")))
+        self.assertFalse(satisfiable(And("a", Not("a"))))
+        self.assertFalse(satisfiable(And(Good("a"), Bad("a"))))
+
+    def test_constants(self):
+        self.assertEqual(smt_all_models(Or("a", Not("a"))), [set()])
+        self.assertEqual(smt_all_models(And(Good("a"), Not(Good("a")))), [])
+        self.assertFalse(satisfiable(Not(True)))
+        self.assertTrue(entails("a", Impl("b", "b")))
+
+    def test_report_model(self):
+        model = satisfiable(And("a", Not("b")), report_model=True)
+        self.assertEqual(model, {Atom("a"), Not(Atom("b"))})
+
+    def test_entails(self):
+        self.assertTrue(entails(And("a", "b"), "a"))
+        self.assertFalse(entails(Or("a", "b"), "a"))
+        self.assertTrue(entails(Good("a"), Not(Bad("a"))))
+
+    def test_theory(self):
+        self.assertFalse(satisfiable(And(Causes("a", "b"), Causes("b", "a"))))
+        self.assertFalse(satisfiable(And(Causes("a", "b"), Not("a"))))
+        self.assertFalse(satisfiable(Formula.makeConjunction([Better("a", "b"), Better("b", "c"), Not(Better("a", "c"))])))
+        self.assertTrue(satisfiable(Formula.makeConjunction([Better("a", "b"), Better("b", "c"), Better("a", "c")])))
+        self.assertTrue(entails(Gt("a", "b"), Not(Eq("a", "b"))))
+
+    def test_only_consistent_models(self):
+        f = Formula.makeConjunction([Or(Good("a"), Bad("a")), Or(Causes("a", "b"), Causes("b", "a")), Or("a", Not("b"))])
+        models = smt_all_models(f)
+        self.assertTrue(len(models) > 0)
+        self.assertTrue(all(theory_sat(m) for m in models))
+
+    def test_models_are_lazy(self):
+        models = smt_iter_models(Formula.makeDisjunction(["a", "b", "c"]))
+        self.assertIsNotNone(next(models))
+        self.assertEqual(len(smt_all_models(Formula.makeDisjunction(["a", "b", "c"]))), 3)
+
+    def test_session(self):
+        s = BDDSolver(theory=True)
+        s.append_formula(Impl("a", "b"))
+        s.append_formula("a")
+        self.assertTrue(s.entails("b"))
+        self.assertFalse(s.satisfiable(Not("b")))
+        s.push()
+        s.append_formula(Good("b"))
+        self.assertFalse(s.satisfiable(Bad("b")))
+        self.assertTrue(s.entails(Good("b")))
+        s.pop()
+        self.assertTrue(s.satisfiable(Bad("b")))
+        self.assertFalse(s.entails(Good("b")))
+        self.assertEqual(s.get_model(), {Atom("a"), Atom("b")})
+
+    def test_cdcl_session(self):
+        f = And(Or("a", Good("b")), Impl("a", Causes("a", "c")))
+        s = CDCLSession(f)
+        for literals in [["a"], [Not("a")], [Bad("b"), Not("a")], [Not("c"), "a"], [Causes("c", "a"), "a"], [Bad("d")]]:
+            self.assertEqual(s.satisfiable(*literals), satisfiable(And(f, Formula.makeConjunction(literals))))
+        model = s.get_model(Not("a"))
+        self.assertIn(Good("b"), model)
+        self.assertIn(Not(Bad("b")), model)
+        self.assertFalse(s.get_model(Bad("b"), Not("a")))
+        self.assertFalse(CDCLSession(And("a", Not("a"))).satisfiable())
+        self.assertEqual(len(list(backends["cdcl"].iter_models(Or("a", Bool(True))))), 2)
+
+    def test_backends_agree(self):
+        formulae = [And(Causes("a", "b"), Causes("b", "a")),
+                    And(Or(Good("a"), Bad("a")), Impl(Good("a"), Bad("a"))),
+                    Formula.makeConjunction([Or(Better("a", "b"), "c"), Better("b", "c"), Not(Better("a", "c")), Not("c")]),
+                    Formula.makeConjunction([BiImpl("a", Not("b")), Or(I("a"), I(Not("a"))), Causes("a", "c")]),
+                    Formula.makeConjunction([Better("a", "b"), Better("b", "c"), Better("c", "a"), Or("x", Better("a", "c"))])]
+        for f in formulae:
+            results = set()
+            for backend in ["bdd", "cdcl", "truthtable"]:
+                models = smt_all_models(f, backend = backend)
+                self.assertTrue(all(theory_sat(m) and satisfiable(And(f, Formula.makeConjunction(list(m))), backend = "bdd") for m in models))
+                results.add(satisfiable(f, backend = backend))
+            self.assertEqual(len(results), 1)
+        # The cycle is only inconsistent with the unassigned Better('a', 'c') of the BDD cube
+        f = formulae[-1]
+        self.assertEqual({count_models(f, backend = b) for b in ["bdd", "truthtable"]}, {0})
+        self.assertEqual({len(smt_all_models(f, backend = b)) for b in ["bdd", "cdcl", "truthtable"]}, {0})
+        self.assertFalse(satisfiable(f))
+
+    def test_backend_selection(self):
+        self.assertEqual(select_backend(And(Or("a", Not("b")), "c")), "cdcl")
+        self.assertEqual(select_backend(Or(And("a", "b"), "c")), "truthtable")
+        self.assertEqual(select_backend(Formula.makeDisjunction([And("a" + str(i), "b") for i in range(20)])), "bdd")
+        self.assertEqual(select_backend(And("a", "b"), enumerate = True), "bdd")
+        use_backend("cdcl")
+        try:
+            self.assertEqual(len(smt_all_models(Or("a", "b"))), 3)
+        finally:
+            use_backend(None)
+        with self.assertRaises(ValueError):
+            use_backend("sat4j")
+
+    def test_cdcl(self):
+        s = CDCLSolver([[1, 2], [-1, 2], [-2, 3]])
+        self.assertEqual(s.solve()[3], True)
+        self.assertIsNone(s.solve([-3]))
+        s.add_clause([-3])
+        self.assertIsNone(s.solve())
+
+    def test_count_models(self):
+        for backend in ["bdd", "truthtable"]:
+            self.assertEqual(count_models(Or("a", And("b", "c")), backend = backend), 5)
+            self.assertEqual(count_models(Or(Good("a"), Bad("a")), backend = backend), 2)
+            self.assertEqual(count_models(And("a", Not("a")), backend = backend), 0)
+        f = Formula.makeDisjunction([And("a" + str(i), "b" + str(i)) for i in range(8)])
+        self.assertEqual(count_models(f, backend = "bdd"), 4**8 - 3**8)
+        self.assertEqual(count_models(f), 4**8 - 3**8)
+        # Deeper than the recursion limit
+        f = Formula.makeConjunction([Or("a" + str(i), "b" + str(i)) for i in range(300)])
+        self.assertEqual(count_models(f), 3**300)
+
+    def test_query_cache(self):
+        cache_clear()
+        f = And(Or("a", "b"), Causes("a", "c"))
+        self.assertTrue(satisfiable(f))
+        self.assertTrue(satisfiable([Or("a", "b"), Causes("a", "c")]))
+        self.assertEqual(cache_info().hits, 1)
+        model = satisfiable(f, report_model = True)
+        model.clear()
+        self.assertTrue(len(satisfiable(f, report_model = True)) > 0)
+        set_cache_size(1)
+        try:
+            self.assertFalse(entails("a", "b"))
+            models = smt_all_models(Or("a", "b"))
+            self.assertEqual(cache_info().currsize, 1)
+            self.assertEqual(smt_all_models(Or("a", "b")), models)
+            self.assertEqual(cache_info().hits, 4)
+        finally:
+            set_cache_size(4096)
+        cache_clear()
+        self.assertEqual(cache_info(), (0, 0, 4096, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import time
+from ethics.language import *
+from ethics.solver import smt_all_models, BDDSolver
+
+
+class TestSolverPerformance(unittest.TestCase):
+    """ Times the BDD on wide conjunctions, every CAM evaluation and explanation builds such formulae. """
+
+    def wide(self, n):
+        return [Atom("w" + str(n) + "_" + str(i)) for i in range(n)]
+
+    def test_all_models_of_wide_conjunctions(self):
+        for n in (100, 300, 1000):
+            atoms = self.wide(n)
+            start = time.time()
+            models = smt_all_models(Formula.makeConjunction(atoms))
+            elapsed = time.time() - start
+            print("all models of a conjunction of " + str(n) + " atoms: " + str(round(elapsed, ndigits=4)) + "s")
+            self.assertEqual(models, [set(atoms)])
+            self.assertLess(elapsed, 2)
+
+    def test_session_on_wide_conjunctions(self):
+        atoms = self.wide(1000)
+        start = time.time()
+        s = BDDSolver(theory=True)
+        s.append_formula(Formula.makeConjunction(atoms[:500]))
+        s.push()
+        s.append_formula(Formula.makeDisjunction(atoms[500:]))
+        self.assertTrue(s.entails(atoms[0]))
+        self.assertFalse(s.entails(atoms[-1]))
+        s.pop()
+        self.assertEqual(s.get_model(), set(atoms[:500]))
+        elapsed = time.time() - start
+        print("session on 1000 atoms: " + str(round(elapsed, ndigits=4)) + "s")
+        self.assertLess(elapsed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
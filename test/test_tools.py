@@ -0,0 +1,74 @@
+import unittest
+from ethics.language import *
+from ethics.tools import constructors, parse_formula, my_eval, FormulaSyntaxError, SymbolTable, convert_formula_to_pyeda, convert_pyeda_model_to_hera, convert_hera_model_to_pyeda, mapBackToFormulae
+
+
+class TestTools(unittest.TestCase):
+
+    def test_symbol_table(self):
+        t = SymbolTable()
+        self.assertEqual(t.index(Causes("a", "b")), 1)
+        self.assertEqual(t.index(Atom("a")), 2)
+        self.assertEqual(t.index(Causes("a", "b")), 1)
+        self.assertIs(t.atom(1), Causes("a", "b"))
+        self.assertEqual(t.encode(Not("a")), -2)
+        self.assertIs(t.decode(-1), Not(Causes("a", "b")))
+        self.assertEqual(len(t), 2)
+
+    def test_pyeda_round_trip(self):
+        f = And(Caused("d"), Not(Causes("a", Not("b"))))
+        model = convert_pyeda_model_to_hera(convert_formula_to_pyeda(f).satisfy_one())
+        self.assertEqual(model, {Caused("d"), Not(Causes("a", Not("b")))})
+        self.assertEqual(convert_pyeda_model_to_hera(convert_hera_model_to_pyeda(model)), model)
+        t = SymbolTable()
+        model = convert_pyeda_model_to_hera(convert_formula_to_pyeda(f, t).satisfy_one(), t)
+        self.assertEqual(model, {Caused("d"), Not(Causes("a", Not("b")))})
+        self.assertEqual(len(t), 2)
+        self.assertEqual(convert_pyeda_model_to_hera(convert_hera_model_to_pyeda(model, t), t), model)
+
+    def test_dimacs(self):
+        f = And(Or("a", Not(Good("b"))), Or(Good("b"), "c"))
+        clauses, m = f.dimacs()
+        self.assertEqual(clauses, [[1, -2], [2, 3]])
+        self.assertEqual(mapBackToFormulae([-1, 2, 3], m), [Not("a"), Good("b"), Atom("c")])
+        with self.assertRaises(ValueError):
+            mapBackToFormulae([3], {Atom("a"): 1})
+
+    def test_parse_formula(self):
+        self.assertIs(parse_formula("And('a', Not(Causes('a', 'b')))"), And("a", Not(Causes("a", "b"))))
+        self.assertIs(parse_formula("Gt(U(Or('a', \"b\")), -5)"), Gt(U(Or("a", "b")), -5))
+        self.assertIs(parse_formula("'pull'"), Atom("pull"))
+        self.assertIs(parse_formula("True"), Bool(True))
+        f = Formula.makeConjunction([Good("a"), Impl(I("b"), Not(Finally("c")))])
+        self.assertIs(parse_formula(repr(f)), f)
+
+    def test_parse_repr(self):
+        for name, cls in constructors.items():
+            if cls is Atom:
+                f = Atom("a")
+            elif cls is Bool:
+                f = Bool(False)
+            elif issubclass(cls, Term):
+                args = [U("a"), Minus(U("b"))]
+                f = cls(*args[:1 if issubclass(cls, OnePlacedTerm) else 2])
+            else:
+                f = cls("a") if issubclass(cls, OnePlaced) and not issubclass(cls, TwoPlaced) else cls("a", Not("b"))
+            self.assertIs(parse_formula(repr(f)), f, name)
+        f = Gt(Add(U("a"), U("b")), Sub(DR("c", "d"), DB("e", 2)))
+        self.assertIs(parse_formula(repr(f)), f)
+
+    def test_syntax_errors(self):
+        with self.assertRaises(FormulaSyntaxError) as e:
+            parse_formula("And('a' 'b')")
+        self.assertEqual(e.exception.pos, 8)
+        for text in ["Not('a'", "Not('a', 'b')", "Foo('a')", "__import__('os')", "Not('a'))", "Not(+)"]:
+            with self.assertRaises(FormulaSyntaxError):
+                parse_formula(text)
+
+    def test_my_eval(self):
+        self.assertIs(my_eval("Not('a')"), Not("a"))
+        self.assertIs(my_eval("pull"), Atom("pull"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from ethics.language import *
+from ethics.truthtable import TruthTable, leaves
+from ethics.solver import truth_table
+
+
+class TestTruthTable(unittest.TestCase):
+
+    def test_leaves(self):
+        self.assertEqual(leaves(And(Or("a", Causes("a", "b")), Not("c"))), [Atom("a"), Causes("a", "b"), Atom("c")])
+        # Constants are evaluated, not spanned
+        f = And(Or("a", Bool(False)), Impl(Bool(True), "b"))
+        self.assertEqual(leaves(f), [Atom("a"), Atom("b")])
+        self.assertEqual(TruthTable(leaves(f)).count(f), 1)
+
+    def test_queries(self):
+        t = TruthTable(["a", "b", "c"])
+        self.assertTrue(t.satisfiable(And("a", Not("b"))))
+        self.assertFalse(t.satisfiable(And("a", Not("a"))))
+        self.assertTrue(t.entails(And("a", "b"), Or("b", "c")))
+        self.assertFalse(t.entails(Or("a", "b"), "a"))
+        self.assertEqual(t.entails_all(And("a", "b"), ["a", "c", Impl("a", "b")]), [True, False, True])
+        self.assertEqual(t.count(Or("a", "b")), 6)
+
+    def test_models_as_bits(self):
+        t = TruthTable(["a", "b"])
+        self.assertEqual(t.models(Impl("a", "b")).tolist(), [[False, False], [False, True], [True, True]])
+        self.assertEqual(t.model(1), {Atom("a"), Not("b")})
+        self.assertEqual(t.bits(t.evaluate(Impl("a", "b"))), 0b1101)
+
+    def test_axioms(self):
+        f = Or(Good("a"), Bad("a"))
+        self.assertEqual(TruthTable(leaves(f)).count(f), 3)
+        self.assertEqual(truth_table(f).count(f), 2)
+
+    def test_size_limit(self):
+        with self.assertRaises(ValueError):
+            TruthTable(["a" + str(i) for i in range(21)])
+
+
+if __name__ == '__main__':
+    unittest.main()